@@ -0,0 +1,105 @@
+"""
+Время импорта модулей пакета src в новом процессе.
+
+Каждый модуль импортируется в отдельном свежем интерпретаторе (как при
+старте процесса пула), замеры повторяются, выводится медиана. Кроме
+времени проверяется, какие тяжёлые зависимости оказались загружены:
+генерация и расчёт расстояний не должны тянуть matplotlib и scipy.
+
+Запуск из корня проекта:
+    python benchmarks/bench_import.py [--repeat 5] [--check]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+MODULES = [
+    'src',
+    'src.instrumentation',
+    'src.rng',
+    'src.normal_sources',
+    'src.covariance',
+    'src.distributions',
+    'src.data_generation',
+    'src.analysis',
+    'src.estimation',
+    'src.classifier',
+    'src.binary',
+    'src.dataset',
+    'src.cache',
+    'src.bayes_error',
+    'src.experiments',
+    'src.report',
+]
+
+HEAVY_MODULES = ['matplotlib', 'scipy']
+
+# Модули, которые не должны загружать тяжёлые зависимости при импорте
+LIGHTWEIGHT = [m for m in MODULES if m != 'src.report']
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, repeat: int = 5) -> Tuple[float, List[str]]:
+    """
+    Измеряет время импорта модуля в свежем интерпретаторе.
+
+    Аргументы:
+        module: Имя модуля
+        repeat: Количество повторов
+
+    Возвращает:
+        Кортеж (медиана времени в секундах, загруженные тяжёлые зависимости)
+    """
+    timings = []
+    loaded: List[str] = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result['seconds'])
+        loaded = result['loaded']
+    return statistics.median(timings), loaded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='количество повторов на модуль')
+    parser.add_argument('--check', action='store_true',
+                        help='завершиться с ошибкой, если лёгкий модуль загружает тяжёлые зависимости')
+    args = parser.parse_args()
+
+    baseline, _ = measure_import('numpy', args.repeat)
+    print(f"{'модуль':<22}{'мс':>9}{'без numpy':>12}  зависимости")
+    print(f"{'numpy':<22}{baseline * 1e3:>9.1f}{0.0:>12.1f}")
+
+    failures: Dict[str, List[str]] = {}
+    for module in MODULES:
+        seconds, loaded = measure_import(module, args.repeat)
+        print(f"{module:<22}{seconds * 1e3:>9.1f}{(seconds - baseline) * 1e3:>12.1f}  {', '.join(loaded) or '-'}")
+        if module in LIGHTWEIGHT and loaded:
+            failures[module] = loaded
+
+    if args.check and failures:
+        for module, loaded in failures.items():
+            print(f"ОШИБКА: {module} загружает {', '.join(loaded)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,361 @@
+"""
+Набор бенчмарков генерации, оценки параметров, расстояний и отчётов.
+
+Каждый замер (функция, объём выборки, размерность) выполняется в
+отдельном процессе: так пиковый объём памяти (ru_maxrss) относится
+к одному замеру, а кэши и пулы памяти предыдущих замеров не влияют
+на результат. В процессе данные готовятся заранее, первый вызов
+(с отложенными импортами scipy и matplotlib) замеряется отдельно,
+затем функция вызывается repeat раз и берётся лучшее время.
+
+Результаты записываются в JSON вместе с описанием окружения; с флагом
+--compare сравниваются с сохранёнными ранее, и при замедлении больше
+порога скрипт завершается с ошибкой.
+
+Запуск из корня проекта:
+    python benchmarks/bench_suite.py --preset quick --output bench.json
+    python benchmarks/bench_suite.py --preset full --cases estimate_parameters_analysis
+    python benchmarks/bench_suite.py --preset quick --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import numpy as np  # noqa: E402
+
+PRESETS = {
+    'quick': {'sizes': [10**3, 10**4, 10**5], 'dims': [2, 8, 32]},
+    'full': {'sizes': [10**3, 10**4, 10**5, 10**6, 10**7, 10**8], 'dims': [2, 8, 32, 128, 512]},
+}
+
+# Замеры, которым нужно больше памяти, пропускаются
+DEFAULT_MAX_BYTES = 4 * 1024**3
+
+
+def _random_cov(dim: int, rng: np.random.Generator) -> np.ndarray:
+    a = rng.standard_normal((dim, dim))
+    return a @ a.T / dim + 0.5 * np.eye(dim)
+
+
+def _setup_normal_clt(size: int, dim: int, workdir: str) -> Callable[[], Any]:
+    from src.data_generation import generate_normal_clt
+
+    return lambda: generate_normal_clt(0.0, 1.0, size, rng=0)
+
+
+def _setup_multivariate_clt(size: int, dim: int, workdir: str) -> Callable[[], Any]:
+    from src.data_generation import generate_multivariate_normal_clt
+
+    cov = _random_cov(dim, np.random.default_rng(0))
+    return lambda: generate_multivariate_normal_clt(np.zeros(dim), cov, size, rng=0)
+
+
+def _setup_multivariate_source(source: str) -> Callable[[int, int, str], Callable[[], Any]]:
+    def setup(size: int, dim: int, workdir: str) -> Callable[[], Any]:
+        from src.data_generation import generate_multivariate_normal_clt
+
+        cov = _random_cov(dim, np.random.default_rng(0))
+        return lambda: generate_multivariate_normal_clt(np.zeros(dim), cov, size, rng=0, source=source)
+    return setup
+
+
+def _setup_multivariate_cholesky(size: int, dim: int, workdir: str) -> Callable[[], Any]:
+    from src.distributions import generate_multivariate_normal
+
+    cov = _random_cov(dim, np.random.default_rng(0))
+    return lambda: generate_multivariate_normal(np.zeros(dim), cov, size, rng=0)
+
+
+def _setup_binary_samples(size: int, dim: int, workdir: str) -> Callable[[], Any]:
+    from src.data_generation import generate_binary_samples
+
+    return lambda: generate_binary_samples(size, 0.3, 1, workdir, rng=0, n_features=dim)
+
+
+def _sample(size: int, dim: int) -> np.ndarray:
+    return np.random.default_rng(0).standard_normal((size, dim))
+
+
+def _setup_estimate_analysis(size: int, dim: int, workdir: str) -> Callable[[], Any]:
+    from src.analysis import estimate_parameters
+
+    sample = _sample(size, dim)
+    return lambda: estimate_parameters([sample])
+
+
+def _setup_estimate_distributions(size: int, dim: int, workdir: str) -> Callable[[], Any]:
+    from src.distributions import estimate_parameters
+
+    sample = _sample(size, dim)
+    return lambda: estimate_parameters(sample)
+
+
+def _setup_estimate_file(size: int, dim: int, workdir: str) -> Callable[[], Any]:
+    from src.estimation import _file_moments, estimate_file_parameters
+
+    path = os.path.join(workdir, 'sample.npy')
+    np.save(path, _sample(size, dim))
+
+    def run() -> Any:
+        # Иначе повторы возвращали бы закэшированный результат
+        _file_moments.cache_clear()
+        return estimate_file_parameters(path)
+    return run
+
+
+def _setup_mahalanobis_to_centers(size: int, dim: int, workdir: str) -> Callable[[], Any]:
+    from src.analysis import mahalanobis_to_centers
+
+    rng = np.random.default_rng(0)
+    sample = _sample(size, dim)
+    means = list(rng.standard_normal((10, dim)))
+    covs = [_random_cov(dim, rng) for _ in range(10)]
+    return lambda: mahalanobis_to_centers(sample, means, covs)
+
+
+def _class_estimates(n_classes: int, dim: int) -> List[Any]:
+    rng = np.random.default_rng(0)
+    return [(rng.standard_normal(dim), _random_cov(dim, rng)) for _ in range(n_classes)]
+
+
+def _setup_pairwise(metric: str) -> Callable[[int, int, str], Callable[[], Any]]:
+    def setup(size: int, dim: int, workdir: str) -> Callable[[], Any]:
+        from src.analysis import pairwise_distances
+
+        estimates = _class_estimates(size, dim)
+        return lambda: pairwise_distances(estimates, metric=metric)
+    return setup
+
+
+def _setup_pair_distances(size: int, dim: int, workdir: str) -> Callable[[], Any]:
+    from src.analysis import bhattacharyya_dist, mahalanobis_dist
+
+    (m1, c1), (m2, c2) = _class_estimates(2, dim)
+
+    def run() -> Any:
+        for _ in range(size):
+            mahalanobis_dist(m1, m2, (c1 + c2) / 2)
+            bhattacharyya_dist(m1, m2, c1, c2)
+    return run
+
+
+def _setup_save_scatter(size: int, dim: int, workdir: str) -> Callable[[], Any]:
+    from src.report import save_scatter
+
+    rng = np.random.default_rng(0)
+    samples = [rng.standard_normal((size // 2, 2)), rng.standard_normal((size - size // 2, 2)) + 2]
+    return lambda: save_scatter(samples, workdir, 'bench')
+
+
+def _setup_generate_report(size: int, dim: int, workdir: str) -> Callable[[], Any]:
+    from src.report import generate_report
+
+    estimates = _class_estimates(size, dim)
+    distances = {f"d{i}": float(i) for i in range(size)}
+    files = [f"sample_{i}.npy" for i in range(size)]
+    output_path = os.path.join(workdir, 'report.md')
+
+    def run() -> Any:
+        # Без файла состояния отчёт строится полностью
+        for name in ('report.md', 'report.md.state.json'):
+            Path(workdir, name).unlink(missing_ok=True)
+        generate_report(estimates, distances, files, [], output_path)
+    return run
+
+
+class Case(NamedTuple):
+    """
+    Описание бенчмарка.
+
+    setup(size, dim, workdir) готовит данные и возвращает замеряемую функцию;
+    size - объём выборки (или число классов / повторов, см. unit);
+    bytes_per_item(dim) - оценка памяти на единицу size для отсева замеров.
+    """
+    setup: Callable[[int, int, str], Callable[[], Any]]
+    unit: str
+    bytes_per_item: Callable[[int], float]
+    dims: Optional[Sequence[int]] = None
+    max_size: Optional[int] = None
+
+
+CASES: Dict[str, Case] = {
+    'generate_normal_clt': Case(_setup_normal_clt, 'rows', lambda d: 8 * 3, dims=[1]),
+    'generate_multivariate_normal_clt': Case(_setup_multivariate_clt, 'rows', lambda d: 8 * 3 * d),
+    'generate_multivariate_normal_box_muller': Case(
+        _setup_multivariate_source('box_muller'), 'rows', lambda d: 8 * 2 * d
+    ),
+    'generate_multivariate_normal_ziggurat': Case(_setup_multivariate_source('ziggurat'), 'rows', lambda d: 8 * 2 * d),
+    'generate_multivariate_normal': Case(_setup_multivariate_cholesky, 'rows', lambda d: 8 * 3 * d),
+    'generate_binary_samples': Case(_setup_binary_samples, 'rows', lambda d: 2 * d),
+    'estimate_parameters_analysis': Case(_setup_estimate_analysis, 'rows', lambda d: 8 * 3 * d),
+    'estimate_parameters_distributions': Case(_setup_estimate_distributions, 'rows', lambda d: 8 * 3 * d),
+    'estimate_file_parameters': Case(_setup_estimate_file, 'rows', lambda d: 8 * 2 * d),
+    'mahalanobis_to_centers': Case(_setup_mahalanobis_to_centers, 'rows', lambda d: 8 * 4 * d),
+    'pairwise_mahalanobis': Case(_setup_pairwise('mahalanobis'), 'classes', lambda d: 8 * d * d * 8, max_size=10**3),
+    'pairwise_bhattacharyya': Case(_setup_pairwise('bhattacharyya'), 'classes', lambda d: 8 * d * d * 8, max_size=10**3),
+    'pair_distances': Case(_setup_pair_distances, 'calls', lambda d: 0, max_size=10**4),
+    'save_scatter': Case(_setup_save_scatter, 'points', lambda d: 8 * 4, dims=[2]),
+    'generate_report': Case(_setup_generate_report, 'classes', lambda d: 8 * d * d * 4, max_size=10**4),
+}
+
+
+def _run_case(name: str, size: int, dim: int, repeat: int) -> Dict[str, Any]:
+    """Выполняет один замер в текущем процессе (вызывается в дочернем процессе)."""
+    with tempfile.TemporaryDirectory() as workdir:
+        func = CASES[name].setup(size, dim, workdir)
+        rss_setup = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        func()
+        first_call = time.perf_counter() - start
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    seconds = min(timings)
+    # ru_maxrss в Linux - в килобайтах, в macOS - в байтах
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return {
+        'case': name,
+        'size': size,
+        'dim': dim,
+        'unit': CASES[name].unit,
+        'seconds': seconds,
+        'first_call_seconds': first_call,
+        'throughput': size / seconds if seconds > 0 else float('inf'),
+        'peak_rss_mb': rss_peak * scale / 1024**2,
+        'setup_rss_mb': rss_setup * scale / 1024**2,
+    }
+
+
+def _plan(names: List[str], sizes: List[int], dims: List[int], max_bytes: float) -> List[tuple]:
+    plan = []
+    for name in names:
+        case = CASES[name]
+        for dim in case.dims or dims:
+            for size in sizes:
+                if case.max_size is not None and size > case.max_size:
+                    continue
+                if size * case.bytes_per_item(dim) > max_bytes:
+                    continue
+                plan.append((name, size, dim))
+    return plan
+
+
+def _environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], threshold: float) -> List[str]:
+    """
+    Сравнивает результаты с базовыми.
+
+    Аргументы:
+        results: Новые замеры
+        baseline: Сохранённые замеры
+        threshold: Допустимое относительное замедление (0.1 - на 10%)
+
+    Возвращает:
+        Список описаний замедлившихся замеров
+    """
+    reference = {(r['case'], r['size'], r['dim']): r for r in baseline}
+    regressions = []
+    print(f"\n{'замер':<48}{'было, с':>12}{'стало, с':>12}{'отношение':>11}")
+    for result in results:
+        key = (result['case'], result['size'], result['dim'])
+        if key not in reference:
+            continue
+        ratio = result['seconds'] / reference[key]['seconds']
+        label = f"{key[0]} n={key[1]} d={key[2]}"
+        marker = ' !' if ratio > 1 + threshold else ''
+        print(f"{label:<48}{reference[key]['seconds']:>12.4g}{result['seconds']:>12.4g}{ratio:>11.2f}{marker}")
+        if ratio > 1 + threshold:
+            regressions.append(f"{label}: в {ratio:.2f} раза медленнее")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--preset', choices=PRESETS, default='quick', help='сетка объёмов и размерностей')
+    parser.add_argument('--sizes', type=int, nargs='+', help='объёмы выборок (вместо предустановки)')
+    parser.add_argument('--dims', type=int, nargs='+', help='размерности (вместо предустановки)')
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES), help='бенчмарки')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='повторов на замер после первого вызова (берётся лучшее время)')
+    parser.add_argument('--max-bytes', type=float, default=DEFAULT_MAX_BYTES,
+                        help='пропускать замеры с оценкой памяти больше этого значения')
+    parser.add_argument('--timeout', type=float, default=600, help='ограничение времени замера, с')
+    parser.add_argument('--output', help='файл для сохранения результатов (JSON)')
+    parser.add_argument('--compare', help='файл с базовыми результатами для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.1, help='допустимое замедление при сравнении')
+    parser.add_argument('--run-case', nargs=3, metavar=('CASE', 'SIZE', 'DIM'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        name, size, dim = args.run_case
+        print(json.dumps(_run_case(name, int(size), int(dim), args.repeat)))
+        return 0
+
+    sizes = args.sizes or PRESETS[args.preset]['sizes']
+    dims = args.dims or PRESETS[args.preset]['dims']
+    results = []
+    print(f"{'замер':<48}{'время, с':>12}{'ед./с':>14}{'пик RSS, МБ':>13}")
+    for name, size, dim in _plan(args.cases, sizes, dims, args.max_bytes):
+        label = f"{name} n={size} d={dim}"
+        try:
+            output = subprocess.run(
+                [sys.executable, __file__, '--run-case', name, str(size), str(dim), '--repeat', str(args.repeat)],
+                cwd=PROJECT_DIR, capture_output=True, text=True, check=True, timeout=args.timeout
+            ).stdout
+        except subprocess.TimeoutExpired:
+            print(f"{label:<48}{'таймаут':>12}")
+            continue
+        except subprocess.CalledProcessError as error:
+            print(f"{label:<48}{'ошибка':>12}\n{error.stderr.strip()}", file=sys.stderr)
+            continue
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(result)
+        print(f"{label:<48}{result['seconds']:>12.4g}{result['throughput']:>14.4g}{result['peak_rss_mb']:>13.1f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'environment': _environment(), 'results': results}, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print('\nЗамедления:', *regressions, sep='\n  ', file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,69 +1,150 @@
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 
+from src.analysis import pairwise_distances
+from src.covariance import CovarianceFactor, as_matrix, cached_factors, validate_covariance
+from src.estimation import estimate_file_parameters
+from src.normal_sources import as_source
+from src.rng import make_rng
 
-def generate_normal_vector(mean_vector, covariance_matrix, N, save_filename):
+# ЦПТ по 50 равномерным слагаемым на координату
+DEFAULT_SOURCE = 'clt-50'
+
+
+def _standard_normal_block(shape, rng, source=DEFAULT_SOURCE):
+    """Standard normal block of the given shape from the normal source (CLT in Levy form by default)"""
+    # все слагаемые ЦПТ генерируются одним вызовом, см. src/normal_sources.py
+    return as_source(source).standard_normal(shape, rng)
+
+
+def _upper_symmetric(covariance_matrix):
+    """Symmetric matrix built from the upper triangle (the triangle the lab's formulas read)"""
+    B = np.asarray(covariance_matrix, dtype=float)
+    return np.triu(B) + np.triu(B, 1).T
+
+
+def _transformation_matrices(covariance_matrices):
+    """Lower triangular matrices A with A @ A.T = B for each B, cached per matrix contents"""
+    # validate_covariance factors are used as is
+    factors = cached_factors([
+        B if isinstance(B, CovarianceFactor) else _upper_symmetric(B) for B in covariance_matrices
+    ])
+    return [factor.L for factor in factors]
+
+
+def _transformation_matrix(covariance_matrix):
+    """Lower triangular matrix A with A @ A.T = covariance_matrix (n-dimensional, cached)"""
+    return _transformation_matrices([covariance_matrix])[0]
+
+
+def _column(mean_vector):
+    """Mean vector as an (n, 1) column"""
+    return np.asarray(mean_vector, dtype=float).reshape(-1, 1)
+
+
+def generate_normal_vector(mean_vector, covariance_matrix, N, save_filename, rng=None,
+                           source=DEFAULT_SOURCE):
     """
     Generates N realizations of n-dimensional normal vector.
     Parameters:
         mean_vector: mean vector (n, 1)
-        covariance_matrix: covariance matrix (n, n)
+        covariance_matrix: covariance matrix (n, n) or its validate_covariance factor
         N: sample size
         save_filename: filename for saving
+        rng: numpy Generator or seed (fresh entropy if None)
+        source: standard normal source ('clt-50', 'clt', 'box_muller', 'ziggurat')
     """
-    uniform_vector = np.array([np.zeros(N), np.zeros(N)])
+    rng = make_rng(rng)
+    A = _transformation_matrix(covariance_matrix)
+    standart_vector = _standard_normal_block((len(A), N), rng, source)
 
-    # генерим равномерные выборки и усредняем по цпт
-    cpt_len = 50
-    for i in range(cpt_len):
-        uni = np.array([np.random.uniform(0, 6, N),
-                       np.random.uniform(0, 6, N)])
-        uniform_vector += uni
-    uniform_vector /= cpt_len
+    # Transformation: X = A * ξ + M
+    # A.shape = (n,n), xi.shape = (n, N), result.shape = (n, N)
+    x = A @ standart_vector + _column(mean_vector)
 
-    m = [[3], [3]]
-    sigma = [[np.sqrt(3)], [np.sqrt(3)]]
+    np.save(save_filename, x)
+    return x
 
-    standart_vector = np.sqrt(
-        cpt_len) * (uniform_vector - m) / sigma  # ЦПТ в форме Леви
 
-    # Find transformation matrix A (lower triangular) for 2D case
-    A = np.zeros((2, 2))
-    A[0, 0] = np.sqrt(covariance_matrix[0, 0])
-    A[1, 0] = covariance_matrix[0, 1] / A[0, 0]
-    A[1, 1] = np.sqrt(covariance_matrix[1, 1] - A[1, 0] ** 2)
+def generate_normal_vectors(mean_vectors, covariance_matrices, N, save_filenames=None, rng=None,
+                            source=DEFAULT_SOURCE):
+    """
+    Generates N realizations for each of K classes in one stacked operation.
+    Parameters:
+        mean_vectors: K mean vectors (n, 1)
+        covariance_matrices: K covariance matrices (n, n) or their validate_covariance factors
+        N: sample size per class
+        save_filenames: K filenames for saving (nothing is saved if None)
+        rng: numpy Generator or seed (fresh entropy if None)
+        source: standard normal source ('clt-50', 'clt', 'box_muller', 'ziggurat')
+    Returns an array (K, n, N); class k has the same distribution as
+    generate_normal_vector, but the random stream is shared by all classes.
+    """
+    rng = make_rng(rng)
+    A = np.stack(_transformation_matrices(covariance_matrices))
+    M = np.stack([_column(m) for m in mean_vectors])
+    standart_vectors = _standard_normal_block((len(A), A.shape[1], N), rng, source)
+
+    # X_k = A_k * ξ_k + M_k for all classes at once: (K,n,n) @ (K,n,N) -> (K,n,N)
+    x = A @ standart_vectors
+    x += M
+
+    if save_filenames is not None:
+        for x_k, filename in zip(x, save_filenames):
+            np.save(filename, x_k)
+    return x
 
-    # Transformation: X = A * ξ + M
-    # A.shape = (2,2), xi.shape = (2, N), result.shape = (2, N)
-    x = A @ standart_vector + mean_vector
 
-    np.save(save_filename, x)
-    return x
+def iter_normal_vector(mean_vector, covariance_matrix, N, block_size=65536, rng=None,
+                       source=DEFAULT_SOURCE):
+    """
+    Yields the N realizations as (n, block_size) column blocks,
+    so only one block is held in memory at a time.
+    """
+    rng = make_rng(rng)
+    A = _transformation_matrix(covariance_matrix)
+    mean_vector = _column(mean_vector)
+    for start in range(0, N, block_size):
+        n_block = min(block_size, N - start)
+        yield A @ _standard_normal_block((len(A), n_block), rng, source) + mean_vector
+
+
+def save_normal_vector_stream(mean_vector, covariance_matrix, N, save_filename,
+                              block_size=65536, rng=None, source=DEFAULT_SOURCE):
+    """
+    Streams N realizations into a preallocated (n, N) .npy file
+    in constant memory. Returns the file name.
+    """
+    n = len(_transformation_matrix(covariance_matrix))
+    x = np.lib.format.open_memmap(save_filename, mode='w+', dtype=np.float64, shape=(n, N))
+    offset = 0
+    for block in iter_normal_vector(mean_vector, covariance_matrix, N, block_size, rng, source):
+        x[:, offset:offset + block.shape[1]] = block
+        offset += block.shape[1]
+    x.flush()
+    del x
+    return save_filename
 
 
 def estimate_mean(data_file):
     """Estimates mean vector from data file"""
-    x = np.load(data_file)
-    m_estimate = np.mean(x, axis=1)
+    # Single memory-mapped pass over the file, cached until it changes on disk
+    m_estimate, _ = estimate_file_parameters(data_file, samples_axis=1, ddof=0)
     # Return as column vector for consistency with other functions
     return m_estimate.reshape(-1, 1)
 
 
 def estimate_covariance(data_file):
     """Estimates covariance matrix from data file"""
-    x = np.load(data_file)  # x.shape = (2, N)
-
-    m_estimate = estimate_mean(data_file)  # shape (2, 1)
-    x_centered = x - m_estimate  # Thanks to NumPy broadcasting
-    # Â = (1/N) * Σ (x_centered_i) * (x_centered_i)^T = (1/N) * (X_centered @ X_centered.T)
-    B_estimate = (x_centered @ x_centered.T) / x.shape[1]
-
+    # Â = (1/N) * Σ (x_i - m)(x_i - m)^T, computed from the same cached pass as the mean
+    _, B_estimate = estimate_file_parameters(data_file, samples_axis=1, ddof=0)
     return B_estimate
 
 
 def bhattacharyya_distance(M1, M2, B1, B2):
     """Calculates Bhattacharyya distance between two normal distributions"""
+    B1 = as_matrix(B1)
+    B2 = as_matrix(B2)
     M1 = M1.reshape(-1, 1)
     M2 = M2.reshape(-1, 1)
 
@@ -81,6 +162,7 @@ def bhattacharyya_distance(M1, M2, B1, B2):
 
 def mahalanobis_distance(M1, M2, B):
     """Calculates Mahalanobis distance between two vectors relative to covariance matrix B"""
+    B = as_matrix(B)
     M1 = M1.reshape(-1, 1)
     M2 = M2.reshape(-1, 1)
     diff_mean = M1 - M2
@@ -90,21 +172,25 @@ def mahalanobis_distance(M1, M2, B):
 
 def plot_normal_data(data_list, labels, colors, title, filename):
     """
-    Visualizes normally distributed data.
+    Visualizes normally distributed data (Agg canvas, no pyplot state).
     """
-    plt.figure(figsize=(10, 8))
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
     for data, label, color in zip(data_list, labels, colors):
-        plt.scatter(data[0, :], data[1, :], alpha=0.7,
-                    label=label, color=color, s=20)
+        ax.scatter(data[0, :], data[1, :], alpha=0.7,
+                   label=label, color=color, s=20)
 
-    plt.title(title)
-    plt.xlabel('X1')
-    plt.ylabel('X2')
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    plt.axis('equal')
-    plt.savefig(filename)
-    plt.close()
+    ax.set_title(title)
+    ax.set_xlabel('X1')
+    ax.set_ylabel('X2')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    ax.axis('equal')
+    fig.savefig(filename)
 
 
 if __name__ == "__main__":
@@ -129,6 +215,17 @@ if __name__ == "__main__":
     task3_vector3_path = "task3_vector3.npy"
     # ==============================================================
 
+    # Covariance check (once per class): the matrices above are not symmetric,
+    # the sampler reads their upper triangle, so they are symmetrized the same way
+    print("Covariance matrices:")
+    factors = {}
+    for name, B in [('B_EQUAL', B_EQUAL), ('B1', B1), ('B2', B2), ('B3', B3)]:
+        factors[name] = validate_covariance(B, symmetrize='upper')
+        check = factors[name].validation
+        print(f"{name}: asymmetry {check['asymmetry']:.2f}, symmetrized by {check['symmetrized']}, "
+              f"condition number {check['condition_number']:.1f}")
+    B_EQUAL, B1, B2, B3 = factors['B_EQUAL'], factors['B1'], factors['B2'], factors['B3']
+
     print("=" * 60)
     print("LAB WORK #1: DATA MODELING FOR PATTERN RECOGNITION")
     print("=" * 60)
@@ -170,10 +267,10 @@ if __name__ == "__main__":
     # ==================== TASK 3 ====================
     print("\n--- TASK 3: Three normal distributions with different matrices ---")
 
-    # Generate data
-    data1_task3 = generate_normal_vector(M1, B1, N_SAMPLES, task3_vector1_path)
-    data2_task3 = generate_normal_vector(M2, B2, N_SAMPLES, task3_vector2_path)
-    data3_task3 = generate_normal_vector(M3, B3, N_SAMPLES, task3_vector3_path)
+    # Generate data (all three classes in one stacked draw)
+    data1_task3, data2_task3, data3_task3 = generate_normal_vectors(
+        [M1, M2, M3], [B1, B2, B3], N_SAMPLES,
+        [task3_vector1_path, task3_vector2_path, task3_vector3_path])
 
     # Parameter estimation
     m1_est3 = estimate_mean(task3_vector1_path)
@@ -183,15 +280,14 @@ if __name__ == "__main__":
     b2_est3 = estimate_covariance(task3_vector2_path)
     b3_est3 = estimate_covariance(task3_vector3_path)
 
-    # Calculate Bhattacharyya distances
-    dist_b_12 = bhattacharyya_distance(m1_est3, m2_est3, b1_est3, b2_est3)
-    dist_b_23 = bhattacharyya_distance(m2_est3, m3_est3, b2_est3, b3_est3)
-    dist_b_13 = bhattacharyya_distance(m1_est3, m3_est3, b1_est3, b3_est3)
+    # Calculate all Bhattacharyya distances at once (each covariance factorized once)
+    dist_b = pairwise_distances([(m1_est3, b1_est3), (m2_est3, b2_est3), (m3_est3, b3_est3)],
+                                metric='bhattacharyya')
 
     print("Bhattacharyya distances:")
-    print(f"Between distributions 1 and 2: {dist_b_12:.4f}")
-    print(f"Between distributions 2 and 3: {dist_b_23:.4f}")
-    print(f"Between distributions 1 and 3: {dist_b_13:.4f}")
+    print(f"Between distributions 1 and 2: {dist_b[0, 1]:.4f}")
+    print(f"Between distributions 2 and 3: {dist_b[1, 2]:.4f}")
+    print(f"Between distributions 1 and 3: {dist_b[0, 2]:.4f}")
 
     # Visualization
     plot_normal_data([data1_task3, data2_task3, data3_task3],
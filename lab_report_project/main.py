@@ -9,12 +9,17 @@
 import numpy as np
 from pathlib import Path
 from typing import Dict, List, Tuple, Any
-import matplotlib.pyplot as plt
 
 # Импортируем наши модули
-from src.data_generation import generate_normal_samples, generate_binary_samples
-from src.analysis import estimate_parameters, mahalanobis_dist, bhattacharyya_dist
-from src.report import save_scatter, generate_report
+from src.cache import (
+    ResultCache, cached_estimate_parameters, cached_generate_binary_samples, cached_generate_normal_samples
+)
+from src.analysis import mahalanobis_dist, bhattacharyya_dist
+from src.report import render_scatter_batch, generate_report
+
+# Зерно генерации: при повторном запуске с теми же параметрами выборки
+# и оценки читаются из кэша data/cache
+SEED = 122
 
 def setup_directories() -> Dict[str, Path]:
     """Создает необходимые директории и возвращает пути к ним."""
@@ -22,6 +27,7 @@ def setup_directories() -> Dict[str, Path]:
     dirs = {
         'base': base_dir,
         'data': base_dir / 'data' / 'generated',
+        'cache': base_dir / 'data' / 'cache',
         'reports': base_dir / 'reports',
         'plots': base_dir / 'reports' / 'plots'
     }
@@ -39,16 +45,16 @@ def main():
     """
     # Настройка путей
     dirs = setup_directories()
+    cache = ResultCache(dirs['cache'])
     
     # 1. Параметры для генерации данных
     print("1. Настройка параметров генерации...")
     N = 200  # Количество сэмплов в каждой выборке
     
-    # Параметры нормальных распределений
-    means = [
+    # Параметры двух нормальных распределений с равными ковариационными матрицами
+    means_2d = [
         np.array([1, 0]),
-        np.array([-1, 1]),
-        np.array([1, -2])
+        np.array([-1, 1])
     ]
     
     # Общая ковариационная матрица для первых двух распределений
@@ -73,19 +79,19 @@ def main():
     
     # 4. Генерация выборок с равными ковариационными матрицами
     print("\n2. Генерация выборок с равными ковариационными матрицами...")
-    samples_eq, files_eq = generate_normal_samples(
-        means_2d, covs_equal, N, dirs['data']
+    samples_eq, files_eq = cached_generate_normal_samples(
+        means_2d, covs_equal, N, dirs['data'] / 'equal', cache, seed=SEED
     )
     
     # 5. Генерация выборок с разными ковариационными матрицами
     print("3. Генерация выборок с разными ковариационными матрицами...")
-    samples_uneq, files_uneq = generate_normal_samples(
-        means_3d, covs_unequal, N, dirs['data']
+    samples_uneq, files_uneq = cached_generate_normal_samples(
+        means_3d, covs_unequal, N, dirs['data'] / 'unequal', cache, seed=SEED + 1
     )
     
     # 6. Оценка параметров распределений
     print("\n4. Оценка параметров распределений...")
-    estimations = estimate_parameters(samples_uneq)
+    estimations = cached_estimate_parameters(samples_uneq, cache)
     
     # Вывод оценок параметров
     print("\nОценки параметров распределений:")
@@ -122,39 +128,34 @@ def main():
     
     # 8. Генерация бинарных выборок с вероятностью 0.3
     print("\n6. Генерация бинарных выборок...")
-    binary_samples, binary_files = generate_binary_samples(
-        N, 0.3, 2, dirs['data']
+    binary_samples, binary_files = cached_generate_binary_samples(
+        N, 0.3, 2, dirs['data'], cache, seed=SEED + 2
     )
     
     # 9. Визуализация результатов
     print("\n7. Создание визуализаций...")
     
-    # Визуализация распределений с равными ковариационными матрицами
-    img_eq = save_scatter(
-        samples_eq, 
-        dirs['plots'], 
-        "Два нормальных распределения с равными ковариационными матрицами",
-        "X",
-        "Y",
-        colors=['blue', 'red']
-    )
-    
-    # Визуализация распределений с разными ковариационными матрицами
-    img_uneq = save_scatter(
-        samples_uneq, 
-        dirs['plots'], 
-        "Три нормальных распределения с разными ковариационными матрицами",
-        "X",
-        "Y",
-        colors=['green', 'purple', 'orange']
-    )
+    # Распределения с равными и с разными ковариационными матрицами
+    # строятся одной серией (фигура переиспользуется, запись PNG в фоне)
+    img_eq, img_uneq = render_scatter_batch([
+        {
+            'samples': samples_eq,
+            'output_dir': dirs['plots'],
+            'title': "Два нормальных распределения с равными ковариационными матрицами",
+            'colors': ['blue', 'red'],
+        },
+        {
+            'samples': samples_uneq,
+            'output_dir': dirs['plots'],
+            'title': "Три нормальных распределения с разными ковариационными матрицами",
+            'colors': ['green', 'purple', 'orange'],
+        },
+    ])
     
     # 10. Генерация отчета
     print("\n8. Формирование отчета...")
     report_path = dirs['reports'] / 'lab_report_1.2.2.md'
     generate_report(
-        means=means_2d + means_3d,
-        covs=covs_equal + covs_unequal,
         estimations=estimations,
         distances=distances,
         data_files=files_uneq + files_eq + binary_files,
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Пакетный запуск экспериментов по сетке параметров из файла конфигурации.
+
+Пример:
+    python run_experiments.py configs/example.json --workers 0
+"""
+
+import argparse
+import sys
+
+from src.experiments import load_config, run_experiments
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('config', help='файл конфигурации (.json или .toml)')
+    parser.add_argument('--output', help='директория результатов (вместо output_dir из конфигурации)')
+    parser.add_argument('--workers', type=int,
+                        help='количество процессов (0 - все ядра, по умолчанию из конфигурации)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='только подсчитать эксперименты и уникальные задачи')
+    args = parser.parse_args()
+
+    result = run_experiments(load_config(args.config), args.output, args.workers, args.dry_run)
+    print(f"Экспериментов: {result['n_experiments']}, уникальных задач: {result['n_tasks']}, "
+          f"из кэша: {result['n_cached']}")
+    if result['summary']:
+        print(f"Сводная таблица: {result['summary']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
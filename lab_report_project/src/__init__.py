@@ -3,8 +3,19 @@
 
 Модули:
 - data_generation: Генерация случайных векторов
+- dataset: Контейнер наборов данных с манифестом и чтением через memmap
 - analysis: Анализ данных и расчеты
+- cache: Кэш сгенерированных выборок и оценок по хэшу параметров
+- binary: Упакованное хранение бинарных векторов и статистики по ним
+- bayes_error: Оценка вероятности ошибки классификации методом Монте-Карло
+- classifier: Байесовский классификатор для гауссовых классов (LDA/QDA)
+- covariance: Разложения ковариационных матриц для устойчивых вычислений
+- instrumentation: Замеры времени и счётчики по этапам конвейера
+- experiments: Сетки экспериментов из файлов конфигурации и пакетный запуск
+- normal_sources: Источники нормальных величин (ЦПТ, Бокс-Мюллер, зиккурат) и их сравнение
+- estimation: Однопроходная оценка параметров по файлам с выборками
 - report: Создание отчетов и визуализаций
+- rng: Генераторы случайных чисел и независимые потоки для параллельной работы
 """
 
-__all__ = ['data_generation', 'analysis', 'report']
+__all__ = ['data_generation', 'dataset', 'analysis', 'bayes_error', 'binary', 'cache', 'classifier', 'covariance', 'estimation', 'experiments', 'instrumentation', 'normal_sources', 'report', 'rng']
@@ -1,7 +1,14 @@
-from typing import List, Tuple
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
 import numpy as np
-from scipy.spatial import distance
 
+from .covariance import CovarianceFactor, CovarianceLike, as_factor, as_matrix
+from .instrumentation import count, timed
+
+# Количество векторов, обрабатываемых за один проход
+DEFAULT_CHUNK_SIZE = 65536
+
+@timed('estimate')
 def estimate_parameters(samples: List[np.ndarray]) -> List[Tuple[np.ndarray, np.ndarray]]:
     """
     Оценивает параметры распределения для набора выборок.
@@ -19,71 +26,243 @@ def estimate_parameters(samples: List[np.ndarray]) -> List[Tuple[np.ndarray, np.
         estimates.append((mean_est, cov_est))
     return estimates
 
+@timed('distance')
 def mahalanobis_dist(
     mean1: np.ndarray, 
     mean2: np.ndarray, 
-    cov: np.ndarray
+    cov: CovarianceLike
 ) -> float:
     """
     Вычисляет расстояние Махаланобиса между двумя векторами.
     
     Формула: D² = (x - y)ᵀ · Σ⁻¹ · (x - y)
     
+    Обратная матрица явно не строится: при Σ = L·Lᵀ имеем D² = ||L⁻¹(x - y)||².
+    
     Аргументы:
         mean1: Первый вектор средних (x)
         mean2: Второй вектор средних (y)
-        cov: Ковариационная матрица (Σ)
+        cov: Ковариационная матрица (Σ) или её готовое разложение CovarianceFactor
         
     Возвращает:
         Расстояние Махаланобиса между векторами
     """
     # Вычисляем разность векторов
-    diff = mean1 - mean2
-    
-    # Вычисляем обратную ковариационную матрицу
-    inv_cov = np.linalg.inv(cov)
+    diff = np.ravel(mean1) - np.ravel(mean2)
     
-    # Вычисляем расстояние Махаланобиса
-    # (x-y)ᵀ · Σ⁻¹ · (x-y)
-    distance_squared = np.dot(np.dot(diff.T, inv_cov), diff)
+    # (x-y)ᵀ · Σ⁻¹ · (x-y) через треугольное решение
+    distance_squared = as_factor(cov).mahalanobis_squared(diff)
     
     # Возвращаем квадратный корень (если нужен сам D, а не D²)
     return np.sqrt(distance_squared)
 
+@timed('distance')
 def bhattacharyya_dist(
     mean1: np.ndarray, 
     mean2: np.ndarray, 
-    cov1: np.ndarray, 
-    cov2: np.ndarray
+    cov1: CovarianceLike, 
+    cov2: CovarianceLike
 ) -> float:
     """
     Вычисляет расстояние Бхатачария между двумя многомерными нормальными распределениями.
     
+    Логарифмы определителей берутся из разложений Холецкого, поэтому
+    результат остаётся конечным и при больших размерностях, где
+    np.linalg.det переполняется или обращается в ноль.
+    
     Аргументы:
         mean1: Вектор средних первого распределения
         mean2: Вектор средних второго распределения
-        cov1: Ковариационная матрица первого распределения
-        cov2: Ковариационная матрица второго распределения
+        cov1: Ковариационная матрица первого распределения или её CovarianceFactor
+        cov2: Ковариационная матрица второго распределения или её CovarianceFactor
         
     Возвращает:
         Расстояние Бхатачария между распределениями
+        (inf, если какая-либо из матриц не положительно определена)
     """
-    cov_avg = (cov1 + cov2) / 2
-    mean_diff = mean1 - mean2
+    mean_diff = np.ravel(mean1) - np.ravel(mean2)
+    
+    try:
+        factor1 = as_factor(cov1)
+        factor2 = as_factor(cov2)
+        factor_avg = CovarianceFactor((factor1.cov + factor2.cov) / 2)
+    except np.linalg.LinAlgError:
+        # Вырожденная или не положительно определённая матрица
+        return float('inf')
     
     # Первое слагаемое: взвешенное расстояние между средними
-    inv_cov_avg = np.linalg.inv(cov_avg)
-    term1 = 0.125 * np.dot(np.dot(mean_diff, inv_cov_avg), mean_diff)
+    term1 = 0.125 * factor_avg.mahalanobis_squared(mean_diff)
     
-    # Второе слагаемое: расхождение ковариаций
-    det_cov_avg = np.linalg.det(cov_avg)
-    det_cov1 = np.linalg.det(cov1)
-    det_cov2 = np.linalg.det(cov2)
+    # Второе слагаемое: расхождение ковариаций, ln(|Σ| / sqrt(|Σ1|·|Σ2|))
+    term2 = 0.5 * (factor_avg.logdet - 0.5 * (factor1.logdet + factor2.logdet))
     
-    # Избегаем деления на ноль и логарифма от нуля
-    if det_cov1 <= 0 or det_cov2 <= 0 or det_cov_avg <= 0:
-        return float('inf')
+    return term1 + term2
+
+def _solve_lower_batched(L: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Решает пачку нижнетреугольных систем L[p]·x[p] = b[p] прямой подстановкой.
+    
+    В отличие от np.linalg.solve (LU-разложение, O(d³) на систему)
+    используется треугольная структура: O(d²) на систему, цикл идёт
+    по d строкам, а не по системам пачки.
+    
+    Аргументы:
+        L: Нижнетреугольные матрицы (P, d, d)
+        b: Правые части (P, d)
         
-    term2 = 0.5 * np.log(det_cov_avg / np.sqrt(det_cov1 * det_cov2))
+    Возвращает:
+        Решения (P, d)
+    """
+    x = np.empty_like(b)
+    for k in range(b.shape[1]):
+        x[:, k] = (b[:, k] - np.einsum('pi,pi->p', L[:, k, :k], x[:, :k])) / L[:, k, k]
+    return x
+
+def _class_logdets(covs: List[CovarianceLike]) -> np.ndarray:
+    """
+    Логарифмы определителей ковариационных матриц через разложение Холецкого.
     
-    return term1 + term2
+    Для не положительно определённых матриц возвращается nan.
+    """
+    logdets = np.full(len(covs), np.nan)
+    for k, cov in enumerate(covs):
+        try:
+            logdets[k] = as_factor(cov).logdet
+        except np.linalg.LinAlgError:
+            continue
+    return logdets
+
+@timed('distance')
+def pairwise_distances(
+    estimates: List[Tuple[np.ndarray, CovarianceLike]],
+    metric: str = 'bhattacharyya',
+    cov: Optional[CovarianceLike] = None,
+    chunk_size: int = 4096
+) -> np.ndarray:
+    """
+    Вычисляет матрицу попарных расстояний между K классами.
+    
+    Ковариационная матрица каждого класса раскладывается по Холецкому один
+    раз, логарифмы определителей переиспользуются для всех пар. Полусуммы
+    ковариаций для пар (i < j) обрабатываются пачками по chunk_size пар
+    батчевыми разложениями и треугольными решениями систем.
+    
+    Аргументы:
+        estimates: Список кортежей (мат. ожидание, ковариационная матрица
+                   или CovarianceFactor), как возвращает estimate_parameters
+        metric: 'mahalanobis' или 'bhattacharyya'
+        cov: Общая ковариационная матрица для расстояния Махаланобиса.
+             По умолчанию для каждой пары берётся полусумма ковариаций,
+             как в main.py
+        chunk_size: Количество пар, обрабатываемых за один проход
+        
+    Возвращает:
+        Симметричную матрицу (K, K) с нулями на диагонали; расстояния
+        от класса с вырожденной (не положительно определённой) ковариацией
+        равны inf, остальные пары вычисляются как обычно
+    """
+    if metric not in ('mahalanobis', 'bhattacharyya'):
+        raise ValueError(f"Неизвестная метрика '{metric}'")
+    
+    means = np.array([np.asarray(mean, dtype=float).ravel() for mean, _ in estimates])
+    covs = np.array([as_matrix(c) for _, c in estimates])
+    n_classes, n_features = means.shape
+    result = np.zeros((n_classes, n_classes))
+    
+    if metric == 'mahalanobis' and cov is not None:
+        # Общая матрица: достаточно одного разложения и "отбеливания" средних
+        white = as_factor(cov).whiten(means)
+        sq_norms = np.einsum('ij,ij->i', white, white)
+        gram = white @ white.T
+        distance_squared = np.maximum(sq_norms[:, None] + sq_norms[None, :] - 2 * gram, 0)
+        result = np.sqrt(distance_squared)
+        np.fill_diagonal(result, 0)
+        return result
+    
+    logdets = _class_logdets([c for _, c in estimates])
+    degenerate = np.isnan(logdets)
+    # Заменяем вырожденные матрицы единичными, чтобы не прерывать батч;
+    # соответствующие пары помечаются inf
+    covs = covs.copy()
+    covs[degenerate] = np.eye(n_features)
+    
+    rows, cols = np.triu_indices(n_classes, 1)
+    for start in range(0, len(rows), chunk_size):
+        i = rows[start:start + chunk_size]
+        j = cols[start:start + chunk_size]
+        
+        cov_avg = (covs[i] + covs[j]) / 2
+        mean_diff = means[i] - means[j]
+        
+        # (x - y)ᵀ · Σ⁻¹ · (x - y) = ||L⁻¹ (x - y)||², где Σ = L·Lᵀ
+        L = np.linalg.cholesky(cov_avg)
+        count('factorizations', len(cov_avg))
+        white = _solve_lower_batched(L, mean_diff)
+        distance_squared = np.einsum('pi,pi->p', white, white)
+        
+        if metric == 'mahalanobis':
+            values = np.sqrt(distance_squared)
+        else:
+            logdet_avg = 2 * np.sum(np.log(np.diagonal(L, axis1=1, axis2=2)), axis=1)
+            values = 0.125 * distance_squared + 0.5 * (logdet_avg - 0.5 * (logdets[i] + logdets[j]))
+        values[degenerate[i] | degenerate[j]] = np.inf
+        
+        result[i, j] = values
+        result[j, i] = values
+    
+    return result
+
+@timed('distance')
+def mahalanobis_to_centers(
+    X: Union[np.ndarray, str, Path],
+    means: List[np.ndarray],
+    covs: Union[CovarianceLike, List[CovarianceLike]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    squared: bool = False
+) -> np.ndarray:
+    """
+    Вычисляет расстояния Махаланобиса от каждого вектора выборки до центров K классов.
+    
+    Для каждого класса один раз строится отбеливающее преобразование L⁻¹
+    и отбеленный центр; выборка обрабатывается блоками по chunk_size
+    строк, так что файлы .npy больше оперативной памяти читаются через
+    mmap по частям.
+    
+    Аргументы:
+        X: Матрица (N, n_features) или путь к файлу .npy с ней
+        means: Список K векторов средних
+        covs: Общая ковариационная матрица (или CovarianceFactor) для всех
+              классов либо список из K матриц/разложений
+        chunk_size: Количество векторов, обрабатываемых за один проход
+        squared: Если True, возвращает квадраты расстояний
+        
+    Возвращает:
+        Матрицу расстояний размера (N, K)
+    """
+    if isinstance(X, (str, Path)):
+        X = np.load(X, mmap_mode='r')
+    
+    means = [np.ravel(mean).astype(float) for mean in means]
+    shared = isinstance(covs, CovarianceFactor) or (isinstance(covs, np.ndarray) and covs.ndim == 2)
+    if shared:
+        factor = as_factor(covs)
+        factors = [factor] * len(means)
+    else:
+        factors = [as_factor(cov) for cov in covs]
+    
+    # Отбеливающие преобразования и отбеленные центры: L⁻¹(x - m) = L⁻¹x - L⁻¹m
+    transforms = [np.ascontiguousarray(f.whitening_matrix.T) for f in factors]
+    white_means = [mean @ transform for mean, transform in zip(means, transforms)]
+    
+    n_samples = len(X)
+    result = np.empty((n_samples, len(means)))
+    for start in range(0, n_samples, chunk_size):
+        stop = min(start + chunk_size, n_samples)
+        block = np.asarray(X[start:stop], dtype=float)
+        
+        white_block = block @ transforms[0] if shared else None
+        for k, (transform, white_mean) in enumerate(zip(transforms, white_means)):
+            white = (white_block if shared else block @ transform) - white_mean
+            result[start:stop, k] = np.einsum('ij,ij->i', white, white)
+    
+    return result if squared else np.sqrt(result, out=result)
@@ -0,0 +1,210 @@
+"""
+Оценка вероятности ошибки байесовского классификатора методом Монте-Карло.
+
+Для классов с разными ковариационными матрицами вероятность ошибки
+не выражается в замкнутой форме, поэтому она оценивается моделированием:
+выборки генерируются генераторами проекта, классифицируются
+GaussianClassifier с истинными параметрами, а моделирование
+продолжается пачками, пока доверительный интервал не станет уже
+заданного. Рядом с оценкой приводится верхняя граница Бхатачария.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .analysis import pairwise_distances
+from .classifier import GaussianClassifier
+from .data_generation import _resolve_workers, generate_multivariate_normal_clt
+from .distributions import generate_multivariate_normal
+from .normal_sources import NormalSourceLike
+from .rng import RandomLike, spawn_rngs
+
+
+def _error_batch(
+    classifier: GaussianClassifier,
+    counts: np.ndarray,
+    use_clt: bool,
+    rng: np.random.Generator,
+    source: Optional[NormalSourceLike] = None
+) -> np.ndarray:
+    """Моделирует одну пачку и возвращает число ошибок по каждому классу."""
+    errors = np.zeros(len(counts), dtype=np.int64)
+    # Готовые разложения классификатора (в режиме 'lda' - общее для всех классов)
+    for k, (mean, cov, n_k) in enumerate(zip(classifier.means_, classifier.factors_, counts)):
+        if n_k == 0:
+            continue
+        if use_clt or source is not None:
+            sample = generate_multivariate_normal_clt(mean, cov, n_k, rng=rng, source=source)
+        else:
+            sample = generate_multivariate_normal(mean, cov, n_k, rng=rng)
+        errors[k] = np.count_nonzero(classifier.predict(sample) != classifier.classes_[k])
+    return errors
+
+
+def bhattacharyya_bound(
+    means: List[np.ndarray],
+    covs: List[np.ndarray],
+    priors: Optional[Sequence[float]] = None
+) -> float:
+    """
+    Верхняя граница Бхатачария для вероятности ошибки.
+
+    Для двух классов P_ош <= sqrt(P1·P2)·exp(-B); для K классов
+    границы пар суммируются (граница объединения).
+
+    Аргументы:
+        means: Список векторов средних
+        covs: Список ковариационных матриц
+        priors: Априорные вероятности классов (по умолчанию равные)
+
+    Возвращает:
+        Значение верхней границы (не больше 1)
+    """
+    priors = np.full(len(means), 1 / len(means)) if priors is None else np.asarray(priors, dtype=float)
+    distances = pairwise_distances(list(zip(means, covs)), metric='bhattacharyya')
+    rows, cols = np.triu_indices(len(means), 1)
+    bound = np.sum(np.sqrt(priors[rows] * priors[cols]) * np.exp(-distances[rows, cols]))
+    return float(min(bound, 1.0))
+
+
+def estimate_error_probability(
+    means: List[np.ndarray],
+    covs: List[np.ndarray],
+    priors: Optional[Sequence[float]] = None,
+    ci_width: float = 1e-3,
+    confidence: float = 0.95,
+    batch_size: int = 200_000,
+    max_samples: int = 20_000_000,
+    workers: Optional[int] = None,
+    use_clt: bool = False,
+    rng: RandomLike = None,
+    source: Optional[NormalSourceLike] = None
+) -> Dict[str, Any]:
+    """
+    Оценивает вероятность ошибки байесовского классификатора моделированием.
+
+    В каждой пачке объём выборки каждого класса пропорционален его априорной
+    вероятности (стратифицированная выборка). Пачки моделируются раундами
+    по workers штук в пуле процессов, после каждого раунда проверяется
+    ширина доверительного интервала.
+
+    Аргументы:
+        means: Список векторов средних
+        covs: Список ковариационных матриц
+        priors: Априорные вероятности классов (по умолчанию равные)
+        ci_width: Требуемая полная ширина доверительного интервала
+        confidence: Уровень доверия
+        batch_size: Количество векторов в одной пачке
+        max_samples: Максимальное общее количество векторов
+        workers: Количество процессов (None - в текущем процессе,
+                 0 или меньше - все доступные ядра)
+        use_clt: Если True, генерирует выборки по ЦПТ, иначе точным генератором
+        rng: Генератор случайных чисел или зерно
+        source: Источник нормальных величин ('clt', 'box_muller', 'ziggurat', ...,
+                см. src/normal_sources.py); если задан, use_clt не учитывается
+
+    Возвращает:
+        Словарь с ключами:
+        'error' - оценка вероятности ошибки,
+        'ci_low', 'ci_high' - границы доверительного интервала,
+        'class_errors' - оценки вероятности ошибки для каждого класса,
+        'n_samples' - число смоделированных векторов,
+        'converged' - достигнута ли требуемая ширина интервала,
+        'bhattacharyya_bound' - верхняя граница Бхатачария
+    """
+    n_classes = len(means)
+    priors = np.full(n_classes, 1 / n_classes) if priors is None else np.asarray(priors, dtype=float)
+    priors = priors / priors.sum()
+    classifier = GaussianClassifier.from_estimates(list(zip(means, covs)), priors=priors)
+
+    counts = np.floor(priors * batch_size).astype(np.int64)
+    # Каждый класс с ненулевой вероятностью получает хотя бы одну строку,
+    # иначе его ошибка не оценивается и интервал не сужается
+    counts[(priors > 0) & (counts == 0)] = 1
+    counts[np.argmax(priors)] += batch_size - counts.sum()
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    # Корневая последовательность зёрен порождает новые потоки на каждом раунде
+    if not isinstance(rng, (np.random.Generator, np.random.SeedSequence)):
+        rng = np.random.SeedSequence(rng)
+    batches_per_round = 1 if workers is None else _resolve_workers(workers)
+
+    errors = np.zeros(n_classes, dtype=np.int64)
+    n_per_class = np.zeros(n_classes, dtype=np.int64)
+    executor = ProcessPoolExecutor(max_workers=batches_per_round) if batches_per_round > 1 else None
+    try:
+        while True:
+            round_rngs = spawn_rngs(rng, batches_per_round)
+            if executor is None:
+                results = [_error_batch(classifier, counts, use_clt, r, source) for r in round_rngs]
+            else:
+                results = list(executor.map(
+                    _error_batch,
+                    [classifier] * batches_per_round,
+                    [counts] * batches_per_round,
+                    [use_clt] * batches_per_round,
+                    round_rngs,
+                    [source] * batches_per_round
+                ))
+            errors += np.sum(results, axis=0)
+            n_per_class += counts * batches_per_round
+
+            class_errors = errors / np.maximum(n_per_class, 1)
+            error = float(priors @ class_errors)
+
+            # Дисперсия стратифицированной оценки; поправка Агрести-Коулла
+            # не даёт интервалу схлопнуться, пока ошибок ещё не наблюдалось
+            # (классы с нулевой вероятностью не моделируются и в сумму не входят)
+            sampled = n_per_class > 0
+            adjusted = (errors[sampled] + 2) / (n_per_class[sampled] + 4)
+            half_width = float(z * np.sqrt(np.sum(
+                priors[sampled] ** 2 * adjusted * (1 - adjusted) / n_per_class[sampled]
+            )))
+
+            converged = 2 * half_width <= ci_width
+            if converged or n_per_class.sum() >= max_samples:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return {
+        'error': error,
+        'ci_low': max(error - half_width, 0.0),
+        'ci_high': min(error + half_width, 1.0),
+        'class_errors': class_errors,
+        'n_samples': int(n_per_class.sum()),
+        'converged': bool(converged),
+        'bhattacharyya_bound': bhattacharyya_bound(means, covs, priors),
+    }
+
+
+def pairwise_error_probabilities(
+    means: List[np.ndarray],
+    covs: List[np.ndarray],
+    rng: RandomLike = None,
+    **kwargs: Any
+) -> np.ndarray:
+    """
+    Оценивает вероятность ошибки для каждой пары классов (при равных априорных вероятностях).
+
+    Аргументы:
+        means: Список векторов средних
+        covs: Список ковариационных матриц
+        rng: Генератор случайных чисел или зерно; каждая пара получает свой поток
+        **kwargs: Параметры estimate_error_probability
+
+    Возвращает:
+        Симметричную матрицу (K, K) оценок с нулями на диагонали
+    """
+    n_classes = len(means)
+    rows, cols = np.triu_indices(n_classes, 1)
+    result = np.zeros((n_classes, n_classes))
+    for i, j, pair_rng in zip(rows, cols, spawn_rngs(rng, len(rows))):
+        estimate = estimate_error_probability(
+            [means[i], means[j]], [covs[i], covs[j]], rng=pair_rng, **kwargs
+        )
+        result[i, j] = result[j, i] = estimate['error']
+    return result
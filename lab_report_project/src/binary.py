@@ -0,0 +1,389 @@
+"""
+Компактное хранение бинарных векторов и статистики по ним.
+
+Бинарные векторы упаковываются по 8 признаков в байт (np.packbits вдоль
+оси признаков): строка из d признаков занимает ceil(d / 8) байт вместо
+8·d байт в int64. Оценки вероятностей, совместных появлений и расстояний
+Хэмминга считаются прямо по упакованным данным блоками.
+
+Коррелированные бинарные векторы моделируются гауссовой копулой:
+x_i = [z_i < Φ⁻¹(p_i)], где z - нормальный вектор с подобранной
+корреляционной матрицей.
+"""
+from typing import Optional, Union
+
+import numpy as np
+
+from .covariance import CovarianceFactor
+from .distributions import generate_multivariate_normal
+from .rng import RandomLike, make_rng
+
+# Количество векторов, обрабатываемых за один проход
+DEFAULT_CHUNK_SIZE = 65536
+
+# Число единичных битов в каждом значении байта (для старых версий numpy
+# без np.bitwise_count)
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def packed_width(n_features: int) -> int:
+    """Количество байт на один упакованный вектор из n_features признаков."""
+    return (n_features + 7) // 8
+
+
+def popcount(packed: np.ndarray) -> np.ndarray:
+    """
+    Количество единичных битов в каждом байте массива.
+
+    Аргументы:
+        packed: Массив uint8
+
+    Возвращает:
+        Массив uint8 той же формы
+    """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(packed)
+    return _POPCOUNT_TABLE[packed]
+
+
+def pack_binary(samples: np.ndarray) -> np.ndarray:
+    """
+    Упаковывает бинарные векторы по 8 признаков в байт.
+
+    Аргументы:
+        samples: Матрица (n_samples, n_features) из 0 и 1
+
+    Возвращает:
+        Матрицу uint8 размера (n_samples, ceil(n_features / 8))
+    """
+    return np.packbits(np.asarray(samples) != 0, axis=1)
+
+
+def unpack_binary(packed: np.ndarray, n_features: int) -> np.ndarray:
+    """
+    Распаковывает бинарные векторы.
+
+    Аргументы:
+        packed: Матрица uint8 (n_samples, ceil(n_features / 8))
+        n_features: Исходное количество признаков
+
+    Возвращает:
+        Матрицу uint8 (n_samples, n_features) из 0 и 1
+    """
+    return np.unpackbits(packed, axis=1, count=n_features)
+
+
+def generate_packed_binary(
+    n_samples: int,
+    probability: Union[float, np.ndarray],
+    n_features: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    rng: RandomLike = None
+) -> np.ndarray:
+    """
+    Генерирует бинарные векторы с независимыми координатами сразу в упакованном виде.
+
+    При вероятности 0.5 биты берутся напрямую из случайных байтов,
+    иначе каждый блок сравнивается с порогом и упаковывается, так что
+    распакованные данные существуют только в пределах одного блока.
+
+    Аргументы:
+        n_samples: Количество векторов
+        probability: Вероятность единицы - общая или для каждого признака (n_features,)
+        n_features: Количество признаков
+        chunk_size: Количество векторов, обрабатываемых за один проход
+        rng: Генератор случайных чисел или зерно
+
+    Возвращает:
+        Матрицу uint8 размера (n_samples, ceil(n_features / 8))
+    """
+    rng = make_rng(rng)
+    probability = np.broadcast_to(np.asarray(probability, dtype=float), (n_features,))
+    width = packed_width(n_features)
+    packed = np.empty((n_samples, width), dtype=np.uint8)
+
+    fair = np.all(probability == 0.5)
+    if fair:
+        # Обнуляем биты выравнивания в последнем байте
+        tail_mask = np.uint8((0xFF << (8 * width - n_features)) & 0xFF)
+
+    for start in range(0, n_samples, chunk_size):
+        stop = min(start + chunk_size, n_samples)
+        if fair:
+            block = rng.integers(0, 256, size=(stop - start, width), dtype=np.uint8)
+            block[:, -1] &= tail_mask
+            packed[start:stop] = block
+        else:
+            bits = rng.random((stop - start, n_features), dtype=np.float32) < probability
+            packed[start:stop] = np.packbits(bits, axis=1)
+
+    return packed
+
+
+def binary_marginals(packed: np.ndarray, n_features: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """
+    Оценивает вероятность единицы для каждого признака.
+
+    Единицы подсчитываются по позициям битов прямо в упакованных байтах,
+    без распаковки.
+
+    Аргументы:
+        packed: Упакованная матрица (n_samples, ceil(n_features / 8))
+        n_features: Количество признаков
+        chunk_size: Количество векторов, обрабатываемых за один проход
+
+    Возвращает:
+        Вектор частот (n_features,)
+    """
+    n_samples, width = packed.shape
+    counts = np.zeros((width, 8), dtype=np.int64)
+    for start in range(0, n_samples, chunk_size):
+        block = np.asarray(packed[start:start + chunk_size])
+        for bit in range(8):
+            # Старший бит байта соответствует первому признаку (порядок np.packbits)
+            counts[:, bit] += np.count_nonzero(block & np.uint8(0x80 >> bit), axis=0)
+    return counts.ravel()[:n_features] / n_samples
+
+
+def binary_cooccurrence(packed: np.ndarray, n_features: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """
+    Оценивает вероятности совместного появления единиц для всех пар признаков.
+
+    Каждый блок распаковывается во float32 и перемножается матрично
+    (счётчики блока точны до 2^24 строк), итог накапливается в float64.
+
+    Аргументы:
+        packed: Упакованная матрица (n_samples, ceil(n_features / 8))
+        n_features: Количество признаков
+        chunk_size: Количество векторов, обрабатываемых за один проход
+
+    Возвращает:
+        Матрицу (n_features, n_features) оценок P(x_i = 1, x_j = 1);
+        на диагонали - оценки вероятностей единицы
+    """
+    n_samples = len(packed)
+    chunk_size = min(chunk_size, 1 << 24)
+    counts = np.zeros((n_features, n_features))
+    for start in range(0, n_samples, chunk_size):
+        bits = unpack_binary(np.asarray(packed[start:start + chunk_size]), n_features).astype(np.float32)
+        counts += bits.T @ bits
+    return counts / n_samples
+
+
+def hamming_distances(
+    packed_a: np.ndarray,
+    packed_b: Optional[np.ndarray] = None,
+    chunk_size: int = 256
+) -> np.ndarray:
+    """
+    Вычисляет расстояния Хэмминга между упакованными векторами.
+
+    Расстояние - число единиц в побитовом XOR, поэтому один байт
+    сравнивает сразу 8 признаков. Обе матрицы обходятся блоками по
+    chunk_size строк, что ограничивает размер промежуточного XOR.
+
+    Аргументы:
+        packed_a: Упакованная матрица (n_a, width)
+        packed_b: Упакованная матрица (n_b, width); по умолчанию packed_a
+        chunk_size: Количество строк в блоке по каждой из матриц
+
+    Возвращает:
+        Матрицу (n_a, n_b) расстояний
+    """
+    if packed_b is None:
+        packed_b = packed_a
+    result = np.empty((len(packed_a), len(packed_b)), dtype=np.int64)
+    for start_a in range(0, len(packed_a), chunk_size):
+        block_a = np.asarray(packed_a[start_a:start_a + chunk_size])
+        for start_b in range(0, len(packed_b), chunk_size):
+            block_b = np.asarray(packed_b[start_b:start_b + chunk_size])
+            xor = block_a[:, None, :] ^ block_b[None, :, :]
+            result[start_a:start_a + len(block_a), start_b:start_b + len(block_b)] = (
+                popcount(xor).sum(axis=2, dtype=np.int64)
+            )
+    return result
+
+
+def _bivariate_normal_cdf(h: np.ndarray, k: np.ndarray, rho: np.ndarray, n_nodes: int = 32) -> np.ndarray:
+    """
+    P(Z1 < h, Z2 < k) для стандартного нормального вектора с корреляцией rho.
+
+    Используется представление
+    Φ2(h, k; ρ) = Φ(h)·Φ(k) + 1/(2π) ∫₀^ρ exp(-(h² - 2hkr + k²) / (2(1 - r²))) / √(1 - r²) dr,
+    интеграл берётся квадратурой Гаусса-Лежандра одновременно для всех пар.
+    """
+    from scipy.special import ndtr
+
+    nodes, weights = np.polynomial.legendre.leggauss(n_nodes)
+    h, k, rho = (np.asarray(a, dtype=float)[..., None] for a in (h, k, rho))
+    r = rho * (nodes + 1) / 2
+    one_minus_r2 = 1 - r ** 2
+    integrand = np.exp(-(h ** 2 - 2 * h * k * r + k ** 2) / (2 * one_minus_r2)) / np.sqrt(one_minus_r2)
+    integral = (rho[..., 0] / 2) * np.sum(weights * integrand, axis=-1)
+    return ndtr(h[..., 0]) * ndtr(k[..., 0]) + integral / (2 * np.pi)
+
+
+def _bivariate_normal_pdf(h: np.ndarray, k: np.ndarray, rho: np.ndarray) -> np.ndarray:
+    """Плотность стандартного двумерного нормального вектора с корреляцией rho в точке (h, k)."""
+    one_minus_r2 = 1 - rho ** 2
+    return np.exp(-(h ** 2 - 2 * rho * h * k + k ** 2) / (2 * one_minus_r2)) / (2 * np.pi * np.sqrt(one_minus_r2))
+
+
+def latent_correlation(
+    probabilities: np.ndarray,
+    corr: np.ndarray,
+    n_iter: int = 20,
+    tol: float = 1e-8,
+    max_abs_corr: float = 0.999,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> np.ndarray:
+    """
+    Подбирает корреляционную матрицу гауссовой копулы под заданные бинарные корреляции.
+
+    Для каждой пары признаков корреляция бинарных величин монотонно
+    зависит от корреляции ρ скрытых нормальных величин, а её производная
+    по ρ равна плотности φ2(h, k; ρ). Уравнение решается методом Ньютона
+    с защитной бисекцией, одновременно для блока пар. Пары с нулевой
+    целевой корреляцией пропускаются (им соответствует ρ = 0).
+    Недостижимые корреляции заменяются ближайшими достижимыми, итоговая
+    матрица проецируется на положительно определённые.
+
+    Аргументы:
+        probabilities: Вероятности единицы для каждого признака (n_features,)
+        corr: Желаемая корреляционная матрица бинарных признаков (n_features, n_features)
+        n_iter: Максимальное количество итераций
+        tol: Допустимая невязка по бинарной корреляции
+        max_abs_corr: Ограничение модуля скрытой корреляции
+        chunk_size: Количество пар, обрабатываемых за один проход
+
+    Возвращает:
+        Корреляционную матрицу скрытого нормального вектора (n_features, n_features)
+    """
+    from scipy.special import ndtri
+
+    probabilities = np.asarray(probabilities, dtype=float)
+    corr = np.asarray(corr, dtype=float)
+    n_features = len(probabilities)
+    thresholds = ndtri(probabilities)
+
+    rows, cols = np.triu_indices(n_features, 1)
+    p_i, p_j = probabilities[rows], probabilities[cols]
+    scale = np.sqrt(p_i * (1 - p_i) * p_j * (1 - p_j))
+    # Для вырожденных признаков (p = 0 или 1) корреляция не определена
+    active = np.flatnonzero((scale > 0) & (corr[rows, cols] != 0))
+
+    latent = np.eye(n_features)
+    for start in range(0, len(active), chunk_size):
+        pairs = active[start:start + chunk_size]
+        h, k = thresholds[rows[pairs]], thresholds[cols[pairs]]
+        base = p_i[pairs] * p_j[pairs]
+        pair_scale = scale[pairs]
+        target = corr[rows[pairs], cols[pairs]]
+
+        low = np.full(len(pairs), -max_abs_corr)
+        high = np.full(len(pairs), max_abs_corr)
+
+        # Недостижимые корреляции заменяем достижимыми на границах отрезка
+        at_low = target <= (_bivariate_normal_cdf(h, k, low) - base) / pair_scale
+        at_high = target >= (_bivariate_normal_cdf(h, k, high) - base) / pair_scale
+        done = at_low | at_high
+
+        rho = np.where(at_low, low, np.where(at_high, high, np.clip(target, low, high)))
+        for _ in range(n_iter):
+            residual = (_bivariate_normal_cdf(h, k, rho) - base) / pair_scale - target
+            done |= np.abs(residual) < tol
+            if np.all(done):
+                break
+            # Сужаем отрезок локализации корня и делаем шаг Ньютона
+            low = np.where(residual < 0, rho, low)
+            high = np.where(residual < 0, high, rho)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                step = rho - residual * pair_scale / _bivariate_normal_pdf(h, k, rho)
+            inside = (step >= low) & (step <= high)
+            rho = np.where(done, rho, np.where(inside, step, (low + high) / 2))
+
+        latent[rows[pairs], cols[pairs]] = rho
+        latent[cols[pairs], rows[pairs]] = rho
+
+    # Попарно подобранная матрица может не быть положительно определённой:
+    # отсекаем малые собственные значения и возвращаем единичную диагональ
+    eigenvalues, eigenvectors = np.linalg.eigh(latent)
+    if eigenvalues[0] < 1e-6:
+        latent = (eigenvectors * np.maximum(eigenvalues, 1e-6)) @ eigenvectors.T
+        d = np.sqrt(np.diag(latent))
+        latent = latent / np.outer(d, d)
+    return latent
+
+
+def generate_correlated_binary(
+    n_samples: int,
+    probabilities: np.ndarray,
+    corr: Optional[np.ndarray] = None,
+    latent_corr: Optional[np.ndarray] = None,
+    packed: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    rng: RandomLike = None
+) -> np.ndarray:
+    """
+    Генерирует коррелированные бинарные векторы с заданными вероятностями единиц.
+
+    Скрытые нормальные векторы генерируются блоками через
+    distributions.generate_multivariate_normal с одним заранее
+    вычисленным разложением Холецкого и сравниваются с порогами Φ⁻¹(p).
+
+    Аргументы:
+        n_samples: Количество векторов
+        probabilities: Вероятности единицы для каждого признака (n_features,)
+        corr: Желаемая корреляционная матрица бинарных признаков
+        latent_corr: Готовая корреляционная матрица скрытого вектора
+                     (например, от latent_correlation); имеет приоритет над corr
+        packed: Если True, возвращает упакованные биты (см. pack_binary)
+        chunk_size: Количество векторов, обрабатываемых за один проход
+        rng: Генератор случайных чисел или зерно
+
+    Возвращает:
+        Матрицу uint8 (n_samples, n_features) из 0 и 1 или упакованную
+        матрицу (n_samples, ceil(n_features / 8))
+    """
+    from scipy.special import ndtri
+
+    rng = make_rng(rng)
+    probabilities = np.asarray(probabilities, dtype=float)
+    n_features = len(probabilities)
+    if latent_corr is None:
+        latent_corr = np.eye(n_features) if corr is None else latent_correlation(probabilities, corr)
+
+    factor = CovarianceFactor(latent_corr)
+    thresholds = ndtri(probabilities)
+    mean = np.zeros(n_features)
+
+    width = packed_width(n_features) if packed else n_features
+    result = np.empty((n_samples, width), dtype=np.uint8)
+    for start in range(0, n_samples, chunk_size):
+        stop = min(start + chunk_size, n_samples)
+        bits = generate_multivariate_normal(mean, factor, stop - start, rng=rng) < thresholds
+        result[start:stop] = np.packbits(bits, axis=1) if packed else bits
+
+    return result
+
+
+def binary_correlation(packed: np.ndarray, n_features: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """
+    Оценивает корреляционную матрицу (phi-коэффициенты) бинарных признаков.
+
+    Используется для проверки корреляций, достигнутых generate_correlated_binary.
+
+    Аргументы:
+        packed: Упакованная матрица (n_samples, ceil(n_features / 8));
+                обычную матрицу 0/1 предварительно упакуйте pack_binary
+        n_features: Количество признаков
+        chunk_size: Количество векторов, обрабатываемых за один проход
+
+    Возвращает:
+        Матрицу (n_features, n_features); для постоянных признаков - nan
+    """
+    p11 = binary_cooccurrence(packed, n_features, chunk_size)
+    p = np.diag(p11).copy()
+    std = np.sqrt(p * (1 - p))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (p11 - np.outer(p, p)) / np.outer(std, std)
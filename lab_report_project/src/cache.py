@@ -0,0 +1,329 @@
+"""
+Кэш сгенерированных выборок и оценок параметров на диске.
+
+Ключ записи - хэш параметров (мат. ожидания, ковариации, объёма выборки,
+метода, зерна и версии кода), поэтому повторный запуск с теми же
+входными данными читает готовые результаты, а изменение параметров
+одного класса пересчитывает только этот класс. Размер кэша ограничен,
+при превышении удаляются давно не использованные записи (LRU).
+"""
+import hashlib
+import json
+import os
+import zipfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .analysis import estimate_parameters
+from .covariance import CovarianceFactor, CovarianceLike, as_matrix, validate_covariance
+from .data_generation import generate_binary_vector, generate_normal_class
+from .normal_sources import NormalSourceLike, as_source
+from .rng import stream_rng
+
+# Модули, изменение которых меняет результаты генерации и оценки
+_VERSIONED_MODULES = (
+    'analysis', 'binary', 'covariance', 'data_generation', 'distributions', 'normal_sources', 'rng'
+)
+
+DEFAULT_MAX_BYTES = 1 << 30
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """Хэш исходного кода модулей, от которых зависят кэшируемые результаты."""
+    digest = hashlib.sha256()
+    package_dir = Path(__file__).parent
+    for name in _VERSIONED_MODULES:
+        digest.update((package_dir / f"{name}.py").read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def _array_digest(array: np.ndarray) -> str:
+    """Хэш содержимого, формы и типа массива."""
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha256(f"{array.dtype.str}{array.shape}".encode())
+    digest.update(memoryview(array).cast('B'))
+    return digest.hexdigest()
+
+
+def _canonical(value: Any) -> Any:
+    """Приводит параметры к виду, однозначно сериализуемому в JSON."""
+    if isinstance(value, np.ndarray):
+        return {'__array__': _array_digest(value)}
+    if isinstance(value, CovarianceFactor):
+        # Разложение определяется своей матрицей
+        return _canonical(value.cov)
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items())}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, Path):
+        # Файл идентифицируется путём, временем изменения и размером
+        stat = value.stat()
+        return {'__path__': str(value), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    return value
+
+
+def params_digest(value: Any) -> str:
+    """
+    Хэш произвольной комбинации параметров.
+
+    Массивы хэшируются по содержимому, пути (Path) - по времени
+    изменения и размеру файла, остальное - по JSON-представлению.
+
+    Аргументы:
+        value: Числа, строки, массивы, пути и их списки и словари
+
+    Возвращает:
+        Шестнадцатеричный хэш
+    """
+    payload = json.dumps(_canonical(value), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Хранилище массивов по хэшу параметров с ограничением размера.
+
+    Каждая запись - файл <ключ>.npz; время последнего доступа хранится
+    в mtime файла и используется для вытеснения.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path], max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Аргументы:
+            cache_dir: Директория кэша
+            max_bytes: Максимальный суммарный размер записей
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def key(self, kind: str, **params: Any) -> str:
+        """
+        Вычисляет ключ записи.
+
+        Аргументы:
+            kind: Тип результата ('normal', 'binary', 'estimate', ...)
+            **params: Параметры, от которых зависит результат
+
+        Возвращает:
+            Шестнадцатеричный хэш
+        """
+        return params_digest({'kind': kind, 'version': code_version(), 'params': params})
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npz"
+
+    def get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Читает запись.
+
+        Возвращает:
+            Словарь массивов или None, если записи нет (повреждённая
+            запись, например от прерванной записи, удаляется)
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                arrays = {name: entry[name] for name in entry.files}
+        except FileNotFoundError:
+            return None
+        except (zipfile.BadZipFile, EOFError, OSError, ValueError):
+            path.unlink(missing_ok=True)
+            return None
+        # Отмечаем использование для LRU
+        os.utime(path)
+        return arrays
+
+    def put(self, key: str, **arrays: np.ndarray) -> None:
+        """
+        Сохраняет запись и при необходимости вытесняет старые.
+
+        Аргументы:
+            key: Ключ записи
+            **arrays: Именованные массивы
+        """
+        path = self._path(key)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        """Удаляет давно не использованные записи, пока размер кэша превышает max_bytes."""
+        entries = []
+        for path in self.cache_dir.glob('*.npz'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self) -> None:
+        """Удаляет все записи."""
+        for path in self.cache_dir.glob('*.npz'):
+            path.unlink(missing_ok=True)
+
+
+def _save_if_changed(file_path: Path, key: str, array: np.ndarray) -> None:
+    """Сохраняет массив в .npy, если файл отсутствует или записан для других параметров."""
+    key_path = file_path.with_name(file_path.name + '.key')
+    if file_path.exists() and key_path.exists() and key_path.read_text() == key:
+        return
+    np.save(file_path, array)
+    key_path.write_text(key)
+
+
+def cached_generate_normal_samples(
+    means: List[np.ndarray],
+    covs: List[CovarianceLike],
+    n_samples: int,
+    output_dir: Union[str, Path],
+    cache: ResultCache,
+    seed: int,
+    use_clt: bool = True,
+    source: Optional[NormalSourceLike] = None
+) -> Tuple[List[np.ndarray], List[str]]:
+    """
+    Кэширующий аналог generate_normal_samples (последовательный режим).
+
+    Каждый класс кэшируется отдельно по (mean, cov, n_samples, use_clt,
+    source, seed, номер класса, версия кода); его поток случайных чисел зависит
+    только от seed и номера, поэтому результаты совпадают с
+    generate_normal_samples(..., rng=seed).
+
+    Аргументы:
+        means: Список векторов математических ожиданий
+        covs: Список ковариационных матриц или их разложений (проверяются до генерации)
+        n_samples: Количество сэмплов для каждой выборки
+        output_dir: Директория для сохранения сгенерированных данных
+        cache: Кэш результатов
+        seed: Целое зерно (без зерна результат не воспроизводим и не кэшируется)
+        use_clt: Если True, использует ЦПТ для генерации нормальных величин
+        source: Источник нормальных величин (см. generate_normal_samples)
+
+    Возвращает:
+        Кортеж (список массивов с выборками, список путей к сохранённым файлам)
+    """
+    source = None if source is None else as_source(source)
+    covs = [validate_covariance(cov) for cov in covs]
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    samples = []
+    file_paths = []
+    for i, (mean, cov) in enumerate(zip(means, covs)):
+        key = cache.key(
+            'normal', mean=np.asarray(mean, dtype=float), cov=as_matrix(cov),
+            n_samples=n_samples, use_clt=use_clt, source=None if source is None else source.label,
+            seed=seed, index=i
+        )
+        entry = cache.get(key)
+        if entry is None:
+            sample = generate_normal_class(mean, cov, n_samples, use_clt, stream_rng(seed, i), source)
+            cache.put(key, sample=sample)
+        else:
+            sample = entry['sample']
+        samples.append(sample)
+
+        file_path = output_dir / f"normal_sample_{i+1}.npy"
+        _save_if_changed(file_path, key, sample)
+        file_paths.append(str(file_path))
+
+    return samples, file_paths
+
+
+def cached_generate_binary_samples(
+    n_samples: int,
+    probability: float,
+    n_vectors: int,
+    output_dir: Union[str, Path],
+    cache: ResultCache,
+    seed: int,
+    n_features: int = 2,
+    packed: bool = False
+) -> Tuple[List[np.ndarray], List[str]]:
+    """
+    Кэширующий аналог generate_binary_samples (последовательный режим).
+
+    Аргументы:
+        n_samples: Количество сэмплов в каждой выборке
+        probability: Вероятность успеха (1)
+        n_vectors: Количество генерируемых векторов
+        output_dir: Директория для сохранения сгенерированных данных
+        cache: Кэш результатов
+        seed: Целое зерно
+        n_features: Количество признаков в каждом векторе
+        packed: Если True, генерирует упакованные биты
+
+    Возвращает:
+        Кортеж (список массивов с выборками, список путей к сохранённым файлам)
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    suffix = "_packed" if packed else ""
+
+    samples = []
+    file_paths = []
+    for i in range(n_vectors):
+        key = cache.key(
+            'binary', n_samples=n_samples, probability=probability, n_features=n_features,
+            packed=packed, seed=seed, index=i
+        )
+        entry = cache.get(key)
+        if entry is None:
+            sample = generate_binary_vector(n_samples, probability, n_features, packed, stream_rng(seed, i))
+            cache.put(key, sample=sample)
+        else:
+            sample = entry['sample']
+        samples.append(sample)
+
+        file_path = output_dir / f"binary_sample_{i+1}{suffix}.npy"
+        _save_if_changed(file_path, key, sample)
+        file_paths.append(str(file_path))
+
+    return samples, file_paths
+
+
+def cached_estimate_parameters(
+    samples: List[np.ndarray],
+    cache: ResultCache
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Кэширующий аналог estimate_parameters.
+
+    Ключ - хэш содержимого каждой выборки, так что пересчитываются
+    только изменившиеся классы.
+
+    Аргументы:
+        samples: Список массивов с выборками
+        cache: Кэш результатов
+
+    Возвращает:
+        Список кортежей (оценка мат. ожидания, оценка ковариационной матрицы)
+    """
+    estimates = []
+    for sample in samples:
+        key = cache.key('estimate', sample=np.asarray(sample))
+        entry = cache.get(key)
+        if entry is None:
+            (mean, cov), = estimate_parameters([sample])
+            cache.put(key, mean=mean, cov=cov)
+        else:
+            mean, cov = entry['mean'], entry['cov']
+        estimates.append((mean, cov))
+    return estimates
@@ -0,0 +1,244 @@
+"""
+Байесовский классификатор для нормально распределённых классов.
+
+Режим 'qda' использует собственную ковариационную матрицу каждого класса
+(случай covs_unequal), режим 'lda' - общую объединённую матрицу
+(случай covs_equal). Логарифмы плотностей считаются блоками через
+заранее вычисленные разложения Холецкого и их логарифмы определителей.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .analysis import DEFAULT_CHUNK_SIZE, estimate_parameters, mahalanobis_to_centers
+from .covariance import CovarianceFactor
+from .estimation import OnlineGaussianEstimator
+
+
+class GaussianClassifier:
+    """
+    Классификатор по максимуму апостериорной вероятности для гауссовых классов.
+
+    Параметры задаются по готовым оценкам (from_estimates), по выборкам
+    классов (fit) или накапливаются потоково (partial_fit).
+    """
+
+    def __init__(
+        self,
+        mode: str = 'qda',
+        priors: Optional[Sequence[float]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ):
+        """
+        Аргументы:
+            mode: 'qda' - у каждого класса своя ковариация, 'lda' - общая
+            priors: Априорные вероятности классов (по умолчанию пропорциональны
+                    объёмам выборок, если они известны, иначе равные)
+            chunk_size: Количество векторов, обрабатываемых за один проход
+        """
+        if mode not in ('qda', 'lda'):
+            raise ValueError(f"Неизвестный режим '{mode}', ожидается 'qda' или 'lda'")
+        self.mode = mode
+        self.priors = None if priors is None else np.asarray(priors, dtype=float)
+        self.chunk_size = chunk_size
+
+        self.classes_ = None
+        self.means_ = None
+        self.covs_ = None
+        self.factors_ = None
+        self.log_priors_ = None
+        self._estimators: Dict[int, OnlineGaussianEstimator] = {}
+
+    @classmethod
+    def from_estimates(
+        cls,
+        estimates: List[Tuple[np.ndarray, np.ndarray]],
+        mode: str = 'qda',
+        priors: Optional[Sequence[float]] = None,
+        counts: Optional[Sequence[int]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> 'GaussianClassifier':
+        """
+        Создаёт классификатор по оценкам параметров.
+
+        Аргументы:
+            estimates: Список кортежей (мат. ожидание, ковариационная матрица),
+                       как возвращает estimate_parameters
+            mode: 'qda' или 'lda'
+            priors: Априорные вероятности классов
+            counts: Объёмы выборок классов (веса для объединённой ковариации в режиме 'lda')
+            chunk_size: Количество векторов, обрабатываемых за один проход
+
+        Возвращает:
+            Обученный классификатор
+        """
+        classifier = cls(mode=mode, priors=priors, chunk_size=chunk_size)
+        classifier._set_parameters(
+            np.arange(len(estimates)),
+            [np.ravel(mean) for mean, _ in estimates],
+            [np.asarray(cov, dtype=float) for _, cov in estimates],
+            counts
+        )
+        return classifier
+
+    def fit(self, samples: List[np.ndarray]) -> 'GaussianClassifier':
+        """
+        Обучает классификатор по выборкам классов.
+
+        Аргументы:
+            samples: Список массивов (n_k, n_features); номер класса - индекс в списке
+
+        Возвращает:
+            Этот же классификатор
+        """
+        estimates = estimate_parameters(samples)
+        self._set_parameters(
+            np.arange(len(samples)),
+            [mean for mean, _ in estimates],
+            [cov for _, cov in estimates],
+            [len(sample) for sample in samples]
+        )
+        return self
+
+    def partial_fit(self, X: np.ndarray, y: np.ndarray) -> 'GaussianClassifier':
+        """
+        Дообучает классификатор на очередном блоке размеченных данных.
+
+        Статистики классов накапливаются OnlineGaussianEstimator, поэтому
+        обучающая выборка может не помещаться в память целиком. Вызов только
+        накапливает статистики; оценки и разложения ковариаций вычисляются
+        один раз при первом вызове log_likelihood или predict после него.
+
+        Аргументы:
+            X: Матрица (n_samples, n_features)
+            y: Метки классов (n_samples,), целые числа
+
+        Возвращает:
+            Этот же классификатор
+        """
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y)
+        for label in np.unique(y):
+            estimator = self._estimators.setdefault(int(label), OnlineGaussianEstimator())
+            estimator.update(X[y == label])
+
+        # Параметры пересчитываются лениво (см. _finalize_partial)
+        self.factors_ = None
+        return self
+
+    def _finalize_partial(self) -> None:
+        """Вычисляет параметры по статистикам, накопленным partial_fit."""
+        labels = sorted(self._estimators)
+        for label in labels:
+            if self._estimators[label].n <= 1:
+                raise ValueError(
+                    f"Для класса {label} накоплено {self._estimators[label].n} наблюдений, "
+                    f"для оценки ковариации нужно не меньше 2"
+                )
+        estimates = [self._estimators[label].finalize() for label in labels]
+        self._set_parameters(
+            np.array(labels),
+            [mean for mean, _ in estimates],
+            [cov for _, cov in estimates],
+            [self._estimators[label].n for label in labels]
+        )
+
+    def _check_fitted(self) -> None:
+        """Завершает отложенное обучение partial_fit или сообщает, что модель не обучена."""
+        if self.factors_ is not None:
+            return
+        if not self._estimators:
+            raise RuntimeError("Классификатор не обучен")
+        self._finalize_partial()
+
+    def _set_parameters(
+        self,
+        classes: np.ndarray,
+        means: List[np.ndarray],
+        covs: List[np.ndarray],
+        counts: Optional[Sequence[int]]
+    ) -> None:
+        """Сохраняет параметры классов и заранее раскладывает ковариации."""
+        n_classes = len(classes)
+        weights = np.ones(n_classes) if counts is None else np.asarray(counts, dtype=float)
+
+        if self.mode == 'lda':
+            # Объединённая внутриклассовая ковариация
+            if counts is None:
+                pooled = sum(covs) / n_classes
+            else:
+                pooled = sum((w - 1) * cov for w, cov in zip(weights, covs)) / (weights.sum() - n_classes)
+            covs = [pooled] * n_classes
+            shared = CovarianceFactor(pooled)
+            factors = [shared] * n_classes
+        else:
+            factors = [CovarianceFactor(cov) for cov in covs]
+
+        if self.priors is not None:
+            if len(self.priors) != n_classes:
+                raise ValueError(f"Задано {len(self.priors)} априорных вероятностей для {n_classes} классов")
+            priors = self.priors
+        else:
+            priors = weights
+        priors = priors / priors.sum()
+
+        self.classes_ = classes
+        self.means_ = np.array(means)
+        self.covs_ = covs
+        self.factors_ = factors
+        self.log_priors_ = np.log(priors)
+
+    def log_likelihood(self, X: np.ndarray) -> np.ndarray:
+        """
+        Логарифмы плотностей классов в точках выборки.
+
+        Аргументы:
+            X: Матрица (n_samples, n_features) (допускается np.memmap)
+
+        Возвращает:
+            Матрицу (n_samples, n_classes) значений ln p(x | класс)
+        """
+        self._check_fitted()
+
+        covs = self.factors_[0] if self.mode == 'lda' else self.factors_
+        distance_squared = mahalanobis_to_centers(
+            X, self.means_, covs, chunk_size=self.chunk_size, squared=True
+        )
+        logdets = np.array([factor.logdet for factor in self.factors_])
+        n_features = self.means_.shape[1]
+        return -0.5 * (distance_squared + logdets + n_features * np.log(2 * np.pi))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Относит каждый вектор к классу с максимальной апостериорной вероятностью.
+
+        Выборка обрабатывается блоками, так что полная матрица
+        (n_samples, n_classes) в памяти не создаётся.
+
+        Аргументы:
+            X: Матрица (n_samples, n_features) (допускается np.memmap)
+
+        Возвращает:
+            Массив меток классов (n_samples,)
+        """
+        self._check_fitted()
+        n_samples = len(X)
+        labels = np.empty(n_samples, dtype=self.classes_.dtype)
+        for start in range(0, n_samples, self.chunk_size):
+            stop = min(start + self.chunk_size, n_samples)
+            scores = self.log_likelihood(X[start:stop]) + self.log_priors_
+            labels[start:stop] = self.classes_[np.argmax(scores, axis=1)]
+        return labels
+
+    def score(self, X: np.ndarray, y: np.ndarray) -> float:
+        """
+        Доля правильно классифицированных векторов.
+
+        Аргументы:
+            X: Матрица (n_samples, n_features)
+            y: Истинные метки классов (n_samples,)
+
+        Возвращает:
+            Точность классификации
+        """
+        return float(np.mean(self.predict(X) == np.asarray(y)))
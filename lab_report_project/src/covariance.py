@@ -0,0 +1,408 @@
+"""
+Разложения ковариационных матриц для устойчивых вычислений.
+
+Вместо явного обращения матрицы (np.linalg.inv) и отношения
+определителей (np.linalg.det) используется разложение Холецкого
+Σ = L·Lᵀ: квадратичные формы считаются треугольными решениями,
+а логарифм определителя - как 2·Σ log Lᵢᵢ. Это остаётся конечным и
+точным и при размерностях, где сам определитель уходит в 0 или inf.
+
+cached_factor и cached_factors хранят разложения по содержимому
+матрицы, так что повторная генерация из того же класса не повторяет
+разложение, а новые матрицы пачки раскладываются одним вызовом.
+
+validate_covariance проверяет матрицу до начала работы (симметрия,
+положительная определённость, число обусловленности), при необходимости
+исправляет её и возвращает разложение, которое генераторы и функции
+расстояний принимают вместо матрицы.
+"""
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .instrumentation import count
+
+# Количество разложений, хранимых cached_factor
+FACTOR_CACHE_SIZE = 256
+
+# Наибольший суммарный размер матриц и множителей в кэше разложений (байт)
+FACTOR_CACHE_MAX_BYTES = 256 << 20
+
+# Способы симметризации: среднее с транспонированной, по верхнему или нижнему треугольнику
+SYMMETRIZE_METHODS = ('average', 'upper', 'lower')
+
+# Способы исправления: отсечение собственных чисел или добавка к диагонали
+REPAIR_METHODS = ('clip', 'jitter')
+
+# Наибольшее допустимое число обусловленности (больше - ошибка или исправление)
+DEFAULT_MAX_CONDITION = 1e12
+
+# Допустимая асимметрия max|B - Bᵀ| / max|B| (ошибки округления)
+DEFAULT_SYMMETRY_TOL = 1e-8
+
+
+class CovarianceFactor:
+    """
+    Разложение Холецкого ковариационной матрицы.
+
+    Создаётся один раз на класс и передаётся в функции расстояний
+    и генераторы вместо самой матрицы, чтобы не повторять разложение
+    стоимостью O(d³) при каждом вызове.
+
+    Атрибут validation - отчёт validate_covariance (None, если матрица
+    не проверялась).
+    """
+
+    def __init__(self, cov: np.ndarray):
+        """
+        Аргументы:
+            cov: Симметричная положительно определённая матрица (n_features, n_features)
+
+        Исключения:
+            np.linalg.LinAlgError: если матрица не положительно определена
+        """
+        self.cov = np.asarray(cov, dtype=float)
+        self.L = np.linalg.cholesky(self.cov)
+        count('factorizations')
+        self.logdet = 2 * np.sum(np.log(np.diag(self.L)))
+        self._whitening_matrix = None
+        self.validation: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_cholesky(cls, cov: np.ndarray, L: np.ndarray) -> 'CovarianceFactor':
+        """
+        Создаёт объект из готового множителя Холецкого (например, из пакетного разложения).
+
+        Аргументы:
+            cov: Ковариационная матрица
+            L: Нижнетреугольный множитель, L·Lᵀ = cov
+        """
+        factor = cls.__new__(cls)
+        factor.cov = np.asarray(cov, dtype=float)
+        factor.L = L
+        factor.logdet = 2 * np.sum(np.log(np.diag(L)))
+        factor._whitening_matrix = None
+        factor.validation = None
+        return factor
+
+    @property
+    def n_features(self) -> int:
+        """Размерность пространства."""
+        return self.L.shape[0]
+
+    def whiten(self, x: np.ndarray) -> np.ndarray:
+        """
+        Переводит векторы в пространство, где ковариация единичная: L⁻¹·x.
+
+        Используется матрица whitening_matrix: O(d³) один раз на разложение,
+        далее O(d²) на вектор, без импорта scipy.
+
+        Аргументы:
+            x: Вектор (n_features,) или матрица векторов-строк (n, n_features)
+
+        Возвращает:
+            Массив той же формы
+        """
+        x = np.asarray(x, dtype=float)
+        return x @ self.whitening_matrix.T
+
+    @property
+    def whitening_matrix(self) -> np.ndarray:
+        """
+        Матрица L⁻¹ (вычисляется один раз при первом обращении).
+
+        whiten(X) == X @ whitening_matrix.T.
+        """
+        if self._whitening_matrix is None:
+            self._whitening_matrix = np.linalg.solve(self.L, np.eye(self.n_features))
+        return self._whitening_matrix
+
+    def mahalanobis_squared(self, diff: np.ndarray) -> np.ndarray:
+        """
+        Квадратичная форма diffᵀ · Σ⁻¹ · diff.
+
+        Аргументы:
+            diff: Вектор (n_features,) или матрица разностей (n, n_features)
+
+        Возвращает:
+            Скаляр или массив (n,)
+        """
+        white = self.whiten(diff)
+        return np.einsum('...i,...i->...', white, white)
+
+
+CovarianceLike = Union[np.ndarray, CovarianceFactor]
+
+
+def as_factor(cov: CovarianceLike) -> CovarianceFactor:
+    """
+    Возвращает разложение матрицы; готовые разложения возвращаются как есть.
+
+    Аргументы:
+        cov: Ковариационная матрица или CovarianceFactor
+
+    Возвращает:
+        CovarianceFactor
+    """
+    if isinstance(cov, CovarianceFactor):
+        return cov
+    return CovarianceFactor(cov)
+
+
+def _symmetrize(matrix: np.ndarray, method: str) -> np.ndarray:
+    if method == 'average':
+        return (matrix + matrix.T) / 2
+    if method == 'upper':
+        return np.triu(matrix) + np.triu(matrix, 1).T
+    if method == 'lower':
+        return np.tril(matrix) + np.tril(matrix, -1).T
+    raise ValueError(f"Неизвестный способ симметризации '{method}', доступны: {', '.join(SYMMETRIZE_METHODS)}")
+
+
+def validate_covariance(
+    cov: CovarianceLike,
+    symmetrize: Optional[str] = None,
+    repair: Optional[str] = None,
+    max_condition: float = DEFAULT_MAX_CONDITION,
+    symmetry_tol: float = DEFAULT_SYMMETRY_TOL
+) -> CovarianceFactor:
+    """
+    Проверяет ковариационную матрицу и возвращает её разложение.
+
+    Проверяются форма, конечность значений, симметрия (с допуском на
+    округление) и положительная определённость. Несимметричная матрица
+    отвергается или симметризуется (symmetrize). Матрица с собственными
+    числами не больше λmax / max_condition (вырожденная или плохо
+    обусловленная) отвергается или исправляется (repair):
+    - 'clip': малые собственные числа поднимаются до λmax / max_condition
+      (ближайшая по норме Фробениуса матрица с таким спектром);
+    - 'jitter': к диагонали добавляется δ·I, при котором число
+      обусловленности равно max_condition.
+    Проверка выполняется один раз: готовое разложение передаётся
+    генераторам и функциям расстояний вместо матрицы.
+
+    Аргументы:
+        cov: Ковариационная матрица; готовые разложения возвращаются как есть
+        symmetrize: None (несимметричная матрица - ошибка), 'average',
+                    'upper' или 'lower' (см. SYMMETRIZE_METHODS)
+        repair: None (вырожденная или плохо обусловленная матрица - ошибка),
+                'clip' или 'jitter'
+        max_condition: Наибольшее допустимое число обусловленности (больше 1)
+        symmetry_tol: Допустимая относительная асимметрия
+
+    Возвращает:
+        CovarianceFactor исправленной матрицы; в атрибуте validation -
+        словарь с ключами 'asymmetry', 'symmetrized', 'min_eigenvalue',
+        'max_eigenvalue', 'condition_number', 'repair', 'jitter' и
+        'repair_distance' (норма Фробениуса внесённого изменения)
+
+    Исключения:
+        ValueError: если матрица некорректна и не может быть исправлена
+                    заданными способами
+    """
+    if isinstance(cov, CovarianceFactor):
+        return cov
+    if repair is not None and repair not in REPAIR_METHODS:
+        raise ValueError(f"Неизвестный способ исправления '{repair}', доступны: {', '.join(REPAIR_METHODS)}")
+    if not max_condition > 1:
+        raise ValueError(f"Допустимое число обусловленности должно быть больше 1, получено {max_condition}")
+
+    matrix = np.asarray(cov, dtype=float)
+    if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+        raise ValueError(f"Ковариационная матрица должна быть квадратной, получена форма {matrix.shape}")
+    if not np.all(np.isfinite(matrix)):
+        raise ValueError("Ковариационная матрица содержит inf или nan")
+
+    scale = np.max(np.abs(matrix)) if matrix.size else 0.0
+    asymmetry = float(np.max(np.abs(matrix - matrix.T)) / scale) if scale > 0 else 0.0
+    symmetrized = None
+    if asymmetry > symmetry_tol:
+        if symmetrize is None:
+            raise ValueError(
+                f"Ковариационная матрица не симметрична (относительная асимметрия {asymmetry:.2e}); "
+                f"задайте symmetrize из {', '.join(SYMMETRIZE_METHODS)}"
+            )
+        matrix = _symmetrize(matrix, symmetrize)
+        symmetrized = symmetrize
+
+    eigenvalues = np.linalg.eigvalsh(matrix)
+    low, high = float(eigenvalues[0]), float(eigenvalues[-1])
+    if high <= 0:
+        raise ValueError(f"У ковариационной матрицы нет положительных собственных чисел (наибольшее {high:.3e})")
+
+    validation: Dict[str, Any] = {
+        'asymmetry': asymmetry,
+        'symmetrized': symmetrized,
+        'repair': None,
+        'jitter': 0.0,
+        'repair_distance': 0.0,
+    }
+    floor = high / max_condition
+    if low <= floor:
+        if repair is None and low <= 0:
+            raise ValueError(
+                f"Ковариационная матрица не положительно определена (наименьшее собственное "
+                f"число {low:.3e}); задайте repair из {', '.join(REPAIR_METHODS)}"
+            )
+        if repair is None:
+            raise ValueError(
+                f"Ковариационная матрица плохо обусловлена (число обусловленности {high / low:.3e} "
+                f"не меньше {max_condition:.3e}); задайте repair из {', '.join(REPAIR_METHODS)}"
+            )
+
+        if repair == 'clip':
+            eigenvalues, eigenvectors = np.linalg.eigh(matrix)
+            repaired = (eigenvectors * np.maximum(eigenvalues, floor)) @ eigenvectors.T
+            repaired = (repaired + repaired.T) / 2
+        elif repair == 'jitter':
+            # (λmax + δ) / (λmin + δ) = max_condition
+            jitter = (high - max_condition * low) / (max_condition - 1)
+            repaired = matrix + jitter * np.eye(len(matrix))
+            validation['jitter'] = jitter
+        validation['repair'] = repair
+        validation['repair_distance'] = float(np.linalg.norm(repaired - matrix))
+        matrix = repaired
+        eigenvalues = np.linalg.eigvalsh(matrix)
+        low, high = float(eigenvalues[0]), float(eigenvalues[-1])
+
+    validation['min_eigenvalue'] = low
+    validation['max_eigenvalue'] = high
+    validation['condition_number'] = high / low if low > 0 else np.inf
+
+    try:
+        factor = CovarianceFactor(matrix)
+    except np.linalg.LinAlgError:
+        raise ValueError(
+            f"Разложение Холецкого не удалось (число обусловленности "
+            f"{validation['condition_number']:.3e}); задайте repair из {', '.join(REPAIR_METHODS)}"
+        ) from None
+    factor.validation = validation
+    return factor
+
+
+def as_matrix(cov: CovarianceLike) -> np.ndarray:
+    """Возвращает ковариационную матрицу из матрицы или её разложения."""
+    if isinstance(cov, CovarianceFactor):
+        return cov.cov
+    return np.asarray(cov, dtype=float)
+
+
+_factor_cache: 'OrderedDict[Tuple[Tuple[int, ...], bytes], CovarianceFactor]' = OrderedDict()
+_factor_cache_bytes = 0
+
+
+def _cache_key(cov: np.ndarray) -> Tuple[Tuple[int, ...], bytes]:
+    # Ключ - хэш содержимого, а не сами байты: иначе кэш хранил бы ещё одну копию матрицы
+    return cov.shape, hashlib.sha1(np.ascontiguousarray(cov).data).digest()
+
+
+def _factor_nbytes(factor: CovarianceFactor) -> int:
+    return factor.cov.nbytes + factor.L.nbytes
+
+
+def cached_factor(cov: CovarianceLike) -> CovarianceFactor:
+    """
+    Разложение матрицы с кэшем по её содержимому.
+
+    Хранятся не больше FACTOR_CACHE_SIZE последних разложений общим
+    размером не больше FACTOR_CACHE_MAX_BYTES; одинаковые по значениям
+    матрицы (в том числе разные объекты) раскладываются один раз.
+
+    Аргументы:
+        cov: Ковариационная матрица или CovarianceFactor
+
+    Возвращает:
+        CovarianceFactor
+    """
+    return cached_factors([cov])[0]
+
+
+def _check_square_symmetric(cov: np.ndarray, index: int) -> None:
+    """Быстрая проверка матрицы перед пакетным разложением (без собственных чисел)."""
+    if cov.ndim != 2 or cov.shape[0] != cov.shape[1]:
+        raise ValueError(f"Ковариационная матрица {index} должна быть квадратной, получена форма {cov.shape}")
+    if not np.all(np.isfinite(cov)):
+        raise ValueError(f"Ковариационная матрица {index} содержит inf или nan")
+    scale = np.max(np.abs(cov)) if cov.size else 0.0
+    if scale > 0 and np.max(np.abs(cov - cov.T)) / scale > DEFAULT_SYMMETRY_TOL:
+        raise ValueError(
+            f"Ковариационная матрица {index} не симметрична; симметризуйте её validate_covariance"
+        )
+
+
+def cached_factors(covs: Sequence[CovarianceLike]) -> List[CovarianceFactor]:
+    """
+    Разложения набора матриц с кэшем по содержимому (см. cached_factor).
+
+    Матрицы, которых нет в кэше, проверяются на форму, конечность
+    и симметрию и раскладываются одним пакетным вызовом np.linalg.cholesky.
+    Исправлять матрицы нужно заранее (validate_covariance): кэш их
+    не симметризует.
+
+    Аргументы:
+        covs: Ковариационные матрицы одинаковой размерности или их разложения
+
+    Возвращает:
+        Список CovarianceFactor в порядке covs
+
+    Исключения:
+        ValueError: если матрица некорректна или не положительно определена
+                    (в сообщении - её номер в covs)
+    """
+    global _factor_cache_bytes
+
+    factors: List[CovarianceFactor] = []
+    missing = {}
+    for i, cov in enumerate(covs):
+        if isinstance(cov, CovarianceFactor):
+            factors.append(cov)
+            continue
+        cov = np.asarray(cov, dtype=float)
+        _check_square_symmetric(cov, i)
+        key = _cache_key(cov)
+        factor = _factor_cache.get(key)
+        if factor is not None:
+            _factor_cache.move_to_end(key)
+        else:
+            # Копия: кэш не должен зависеть от последующих изменений массива вызывающим кодом
+            missing.setdefault(key, (cov.copy(), []))[1].append(i)
+        factors.append(factor)
+
+    if missing:
+        stacked = np.stack([cov for cov, _ in missing.values()])
+        try:
+            L = np.linalg.cholesky(stacked)
+        except np.linalg.LinAlgError:
+            # Пакетное разложение не говорит, какая матрица виновата
+            for cov, indices in missing.values():
+                try:
+                    np.linalg.cholesky(cov)
+                except np.linalg.LinAlgError:
+                    raise ValueError(
+                        f"Ковариационная матрица {indices[0]} не положительно определена; "
+                        f"проверьте или исправьте её validate_covariance"
+                    ) from None
+            raise
+        count('factorizations', len(stacked))
+        for (key, (cov, indices)), L_k in zip(missing.items(), L):
+            factor = CovarianceFactor.from_cholesky(cov, L_k)
+            _factor_cache[key] = factor
+            _factor_cache_bytes += _factor_nbytes(factor)
+            for i in indices:
+                factors[i] = factor
+        while _factor_cache and (
+            len(_factor_cache) > FACTOR_CACHE_SIZE or _factor_cache_bytes > FACTOR_CACHE_MAX_BYTES
+        ):
+            _, evicted = _factor_cache.popitem(last=False)
+            _factor_cache_bytes -= _factor_nbytes(evicted)
+    return factors
+
+
+def clear_factor_cache() -> None:
+    """Очищает кэш разложений cached_factor."""
+    global _factor_cache_bytes
+
+    _factor_cache.clear()
+    _factor_cache_bytes = 0
@@ -1,10 +1,31 @@
 import numpy as np
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Tuple, Union, Optional
+from typing import Any, Callable, Iterable, Iterator, List, Sequence, Tuple, Union, Optional
 
+from .binary import generate_packed_binary, packed_width
+from .covariance import CovarianceLike, as_factor, as_matrix, validate_covariance
+from .dataset import SampleDataset
+from .instrumentation import count, stage
+from .normal_sources import NormalSource, NormalSourceLike, as_source
+from .rng import RandomLike, make_rng, recordable_seed, spawn_rngs
 
-def generate_normal_clt(mean: float = 0.0, std: float = 1.0, size: int = 1, n_uniform: int = 12) -> np.ndarray:
+# Количество векторов, обрабатываемых генераторами за один проход
+DEFAULT_CHUNK_SIZE = 65536
+
+# Количество строк в одной задаче параллельной генерации
+DEFAULT_TASK_SIZE = 1_000_000
+
+
+def generate_normal_clt(
+    mean: float = 0.0,
+    std: float = 1.0,
+    size: int = 1,
+    n_uniform: int = 12,
+    rng: RandomLike = None,
+    source: Optional[NormalSourceLike] = None
+) -> np.ndarray:
     """
     Генерирует нормально распределенные числа с использованием ЦПТ.
     
@@ -13,87 +34,329 @@ def generate_normal_clt(mean: float = 0.0, std: float = 1.0, size: int = 1, n_un
         std: Среднеквадратическое отклонение
         size: Количество сэмплов
         n_uniform: Количество равномерных случайных величин для суммирования (по умолчанию 12)
+        rng: Генератор случайных чисел или зерно
+        source: Другой источник нормальных величин (см. src/normal_sources.py);
+                по умолчанию ЦПТ с n_uniform слагаемыми
         
     Возвращает:
         Массив нормально распределенных чисел
     """
-    # Генерируем n_uniform равномерных случайных величин на интервале [0, 1]
-    uniform_samples = np.random.uniform(0, 1, size=(n_uniform, size))
-    
     # (частный случай ЦПТ)
     # Сумма 12 U[0,1] имеет мат. ожидание 6 и дисперсию 1
-    z = (np.sum(uniform_samples, axis=0) - n_uniform/2) / np.sqrt(n_uniform/12)
+    source = NormalSource('clt', n_uniform) if source is None else as_source(source)
+    z = source.standard_normal(size, rng)
     
     # Масштабируем к нужным параметрам
     return mean + std * z
 
 
-def generate_multivariate_normal_clt(mean: np.ndarray, cov: np.ndarray, n_samples: int = 1) -> np.ndarray:
+def generate_multivariate_normal_clt(
+    mean: np.ndarray,
+    cov: CovarianceLike,
+    n_samples: int = 1,
+    n_uniform: int = 12,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    rng: RandomLike = None,
+    source: Optional[NormalSourceLike] = None
+) -> np.ndarray:
     """
     Генерирует многомерное нормальное распределение с использованием ЦПТ.
     
+    Все равномерные величины для блока из chunk_size векторов генерируются
+    одним вызовом, поэтому пиковая память ограничена размером блока
+    (n_uniform * chunk_size * n_features чисел), а не всей выборкой.
+    
     Аргументы:
         mean: Вектор средних значений
-        cov: Ковариационная матрица
+        cov: Ковариационная матрица или её разложение (см. validate_covariance)
         n_samples: Количество сэмплов
+        n_uniform: Количество равномерных случайных величин для суммирования
+        chunk_size: Количество векторов, обрабатываемых за один проход
+        rng: Генератор случайных чисел или зерно
+        source: Другой источник нормальных величин (см. src/normal_sources.py);
+                по умолчанию ЦПТ с n_uniform слагаемыми
         
     Возвращает:
         Матрицу размера (n_samples, n_features) с нормально распределенными векторами
     """
+    mean = np.asarray(mean, dtype=float)
     n_features = len(mean)
+    source = NormalSource('clt', n_uniform) if source is None else as_source(source)
     
-    # Генерируем стандартные нормальные величины с помощью ЦПТ
-    z = np.zeros((n_samples, n_features))
-    for i in range(n_features):
-        z[:, i] = generate_normal_clt(mean=0, std=1, size=n_samples)
-    
-    # Разложение Холецкого для ковариационной матрицы
-    L = np.linalg.cholesky(cov)
+    # Разложение Холецкого для ковариационной матрицы (проверка - в validate_covariance до вызова)
+    L_T = np.ascontiguousarray(as_factor(cov).L.T)
     
-    # Преобразуем к нужному распределению
-    samples = mean + np.dot(z, L.T)
+    samples = np.empty((n_samples, n_features))
+    for start, stop, z_block in source.blocks(n_samples, n_features, chunk_size, make_rng(rng)):
+        # Преобразуем к нужному распределению прямо в выходной массив
+        np.dot(z_block, L_T, out=samples[start:stop])
+        samples[start:stop] += mean
     
     return samples
 
+def _resolve_source(source: Optional[NormalSourceLike], use_clt: bool) -> Optional[NormalSource]:
+    """Источник нормальных величин: заданный явно, иначе ЦПТ или None (rng.multivariate_normal) по use_clt."""
+    if source is not None:
+        return as_source(source)
+    return NormalSource('clt') if use_clt else None
+
+def iter_normal_samples(
+    mean: np.ndarray,
+    cov: CovarianceLike,
+    n_samples: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    use_clt: bool = True,
+    rng: RandomLike = None,
+    source: Optional[NormalSourceLike] = None
+) -> Iterator[np.ndarray]:
+    """
+    Потоково генерирует выборку из многомерного нормального распределения.
+    
+    В памяти одновременно находится только один блок, поэтому размер
+    выборки не ограничен объёмом оперативной памяти (см. write_chunks).
+    
+    Аргументы:
+        mean: Вектор средних значений
+        cov: Ковариационная матрица или её разложение (см. validate_covariance)
+        n_samples: Общее количество сэмплов
+        chunk_size: Количество векторов в одном блоке
+        use_clt: Если True, использует ЦПТ для генерации нормальных величин
+        rng: Генератор случайных чисел или зерно
+        source: Источник нормальных величин ('clt', 'clt-50', 'box_muller',
+                'ziggurat', см. src/normal_sources.py); если задан, use_clt не учитывается
+        
+    Возвращает:
+        Итератор блоков размера (не более chunk_size, n_features)
+    """
+    rng = make_rng(rng)
+    mean = np.asarray(mean, dtype=float)
+    source = _resolve_source(source, use_clt)
+    
+    if source is None:
+        for start, stop in _split_rows(n_samples, chunk_size):
+            yield rng.multivariate_normal(mean, as_matrix(cov), stop - start)
+        return
+    
+    L_T = np.ascontiguousarray(as_factor(cov).L.T)
+    for start, stop, z_block in source.blocks(n_samples, len(mean), chunk_size, rng):
+        block = np.dot(z_block, L_T)
+        block += mean
+        yield block
+
+def write_chunks(
+    chunks: Iterable[np.ndarray],
+    file_path: Union[str, Path],
+    shape: Tuple[int, ...],
+    dtype: Any = np.float64
+) -> str:
+    """
+    Записывает поток блоков в заранее выделенный .npy файл.
+    
+    Файл создаётся через np.lib.format.open_memmap, блоки дописываются
+    последовательно, поэтому запись идёт при постоянном объёме памяти.
+    
+    Аргументы:
+        chunks: Итератор блоков, склеиваемых по первой оси
+        file_path: Путь к создаваемому файлу
+        shape: Итоговая форма массива
+        dtype: Тип данных в файле
+        
+    Возвращает:
+        Путь к сохранённому файлу
+    """
+    out = np.lib.format.open_memmap(file_path, mode='w+', dtype=dtype, shape=shape)
+    offset = _write_blocks(out, chunks, 0)
+    out.flush()
+    count('bytes_written', out.nbytes)
+    del out
+    
+    if offset != shape[0]:
+        raise ValueError(f"Записано {offset} строк, ожидалось {shape[0]}")
+    return str(file_path)
+
+def _write_blocks(out: np.ndarray, chunks: Iterable[np.ndarray], offset: int) -> int:
+    """Последовательно копирует блоки в out начиная с offset; возвращает новый offset."""
+    for chunk in chunks:
+        out[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+    return offset
+
+def _resolve_workers(workers: int) -> int:
+    """Возвращает число процессов; значения <= 0 означают все ядра."""
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def _split_rows(n_samples: int, task_size: int) -> List[Tuple[int, int]]:
+    """Разбивает диапазон строк на интервалы длиной не более task_size."""
+    task_size = max(1, task_size)
+    return [(start, min(start + task_size, n_samples)) for start in range(0, n_samples, task_size)]
+
+
+def _run_tasks(func: Callable[..., None], tasks: Sequence[Tuple[Any, ...]], workers: int) -> None:
+    """Выполняет задачи в пуле процессов (или в текущем процессе при workers == 1)."""
+    workers = min(_resolve_workers(workers), max(1, len(tasks)))
+    if workers == 1:
+        for task in tasks:
+            func(*task)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(func, *task) for task in tasks]
+        for future in as_completed(futures):
+            # Пробрасываем исключения из рабочих процессов
+            future.result()
+
+
+def _normal_chunk_task(
+    file_path: str,
+    start: int,
+    stop: int,
+    mean: np.ndarray,
+    cov: CovarianceLike,
+    use_clt: bool,
+    rng: np.random.Generator,
+    source: Optional[NormalSourceLike] = None
+) -> None:
+    """Генерирует строки [start, stop) нормальной выборки прямо в файл."""
+    out = np.load(file_path, mmap_mode='r+')
+    blocks = iter_normal_samples(mean, cov, stop - start, use_clt=use_clt, rng=rng, source=source)
+    _write_blocks(out, blocks, start)
+    out.flush()
+
+
+def _binary_chunk_task(
+    file_path: str,
+    start: int,
+    stop: int,
+    probability: float,
+    n_features: int,
+    packed: bool,
+    rng: np.random.Generator
+) -> None:
+    """Генерирует строки [start, stop) бинарной выборки прямо в файл."""
+    out = np.load(file_path, mmap_mode='r+')
+    out[start:stop] = generate_binary_vector(stop - start, probability, n_features, packed, rng)
+    out.flush()
+
+
+def generate_binary_vector(
+    n_rows: int,
+    probability: float,
+    n_features: int,
+    packed: bool,
+    rng: np.random.Generator
+) -> np.ndarray:
+    """Генерирует блок бинарных векторов в обычном или упакованном виде."""
+    if packed:
+        return generate_packed_binary(n_rows, probability, n_features, rng=rng)
+    return rng.binomial(1, probability, (n_rows, n_features))
+
+
+def generate_normal_class(
+    mean: np.ndarray,
+    cov: CovarianceLike,
+    n_samples: int,
+    use_clt: bool,
+    rng: np.random.Generator,
+    source: Optional[NormalSourceLike] = None
+) -> np.ndarray:
+    """
+    Генерирует выборку одного класса так же, как последовательный режим generate_normal_samples.
+    
+    Вместе с rng.stream_rng позволяет пересчитать отдельный класс,
+    не генерируя остальные.
+    """
+    source = _resolve_source(source, use_clt)
+    if source is not None:
+        # Используем нашу реализацию (по умолчанию с ЦПТ)
+        return generate_multivariate_normal_clt(mean, cov, n_samples, rng=rng, source=source)
+    # Используем встроенную функцию для сравнения
+    return rng.multivariate_normal(mean, as_matrix(cov), n_samples)
+
+
 def generate_normal_samples(
     means: List[np.ndarray],
-    covs: List[np.ndarray],
+    covs: List[CovarianceLike],
     n_samples: int,
     output_dir: Union[str, Path],
-    use_clt: bool = True
+    use_clt: bool = True,
+    rng: RandomLike = None,
+    workers: Optional[int] = None,
+    task_size: int = DEFAULT_TASK_SIZE,
+    source: Optional[NormalSourceLike] = None
 ) -> Tuple[List[np.ndarray], List[str]]:
     """
     Генерирует выборки из многомерного нормального распределения.
     
+    При заданном workers классы и блоки строк внутри больших классов
+    генерируются в пуле процессов, каждый блок со своим независимым потоком
+    случайных чисел, и записываются прямо в предварительно созданные
+    .npy файлы. Результат зависит только от rng и task_size, но не от
+    количества процессов.
+    
     Аргументы:
         means: Список векторов математических ожиданий
-        covs: Список ковариационных матриц
+        covs: Список ковариационных матриц или их разложений; все матрицы
+              проверяются (validate_covariance) до начала генерации
         n_samples: Количество сэмплов для каждой выборки
         output_dir: Директория для сохранения сгенерированных данных
         use_clt: Если True, использует ЦПТ для генерации нормальных величин
+        rng: Генератор случайных чисел или зерно; каждый класс получает
+             собственный независимый поток
+        workers: Количество процессов (None - последовательная генерация,
+                 0 или меньше - все доступные ядра)
+        task_size: Количество строк в одной параллельной задаче
+        source: Источник нормальных величин ('clt', 'clt-50', 'box_muller',
+                'ziggurat', см. src/normal_sources.py); если задан, use_clt не учитывается
         
     Возвращает:
-        Кортеж (список массивов с выборками, список путей к сохранённым файлам)
+        Кортеж (список массивов с выборками, список путей к сохранённым файлам).
+        В параллельном режиме массивы открыты через np.load(mmap_mode='r')
     """
+    # Ошибка в матрице любого класса обнаруживается до генерации, а
+    # готовые разложения не повторяются в каждой задаче
+    covs = [validate_covariance(cov) for cov in covs]
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     
     samples = []
     file_paths = []
+    class_rngs = spawn_rngs(rng, len(means))
     
-    for i, (mean, cov) in enumerate(zip(means, covs)):
-        if use_clt:
-            # Используем нашу реализацию с ЦПТ
-            sample = generate_multivariate_normal_clt(mean, cov, n_samples)
-        else:
-            # Используем встроенную функцию для сравнения
-            sample = np.random.multivariate_normal(mean, cov, n_samples)
+    if workers is not None:
+        tasks = []
+        for i, (mean, cov, class_rng) in enumerate(zip(means, covs, class_rngs)):
+            file_path = output_dir / f"normal_sample_{i+1}.npy"
+            # Создаём файл нужного размера, блоки дописываются рабочими процессами
+            np.lib.format.open_memmap(
+                file_path, mode='w+', dtype=np.float64, shape=(n_samples, len(mean))
+            ).flush()
+            file_paths.append(str(file_path))
+            
+            rows = _split_rows(n_samples, task_size)
+            for (start, stop), chunk_rng in zip(rows, spawn_rngs(class_rng, len(rows))):
+                tasks.append((str(file_path), start, stop, mean, cov, use_clt, chunk_rng, source))
         
+        with stage('generate'):
+            _run_tasks(_normal_chunk_task, tasks, workers)
+        count('rows_generated', n_samples * len(means))
+        samples = [np.load(file_path, mmap_mode='r') for file_path in file_paths]
+        count('bytes_written', sum(sample.nbytes for sample in samples))
+        return samples, file_paths
+    
+    for i, (mean, cov, class_rng) in enumerate(zip(means, covs, class_rngs)):
+        with stage('generate'):
+            sample = generate_normal_class(mean, cov, n_samples, use_clt, class_rng, source)
+        count('rows_generated', len(sample))
         samples.append(sample)
         
         # Сохранение в файл
         file_path = output_dir / f"normal_sample_{i+1}.npy"
-        np.save(file_path, sample)
+        with stage('save'):
+            np.save(file_path, sample)
+        count('bytes_written', sample.nbytes)
         file_paths.append(str(file_path))
     
     return samples, file_paths
@@ -102,34 +365,195 @@ def generate_binary_samples(
     n_samples: int,
     probability: float,
     n_vectors: int,
-    output_dir: Union[str, Path]
+    output_dir: Union[str, Path],
+    rng: RandomLike = None,
+    workers: Optional[int] = None,
+    task_size: int = DEFAULT_TASK_SIZE,
+    n_features: int = 2,
+    packed: bool = False
 ) -> Tuple[List[np.ndarray], List[str]]:
     """
     Генерирует бинарные случайные векторы.
     
+    Параллельный режим (workers) устроен так же, как в generate_normal_samples.
+    
+    В упакованном режиме (packed) биты хранятся по 8 признаков в байт
+    (см. src/binary.py) в файлах binary_sample_{i}_packed.npy: это в 64 раза
+    меньше, чем int64, и статистики по таким файлам считаются без распаковки.
+    
     Аргументы:
         n_samples: Количество сэмплов в каждой выборке
         probability: Вероятность успеха (1)
         n_vectors: Количество генерируемых векторов
         output_dir: Директория для сохранения сгенерированных данных
+        rng: Генератор случайных чисел или зерно; каждый вектор получает
+             собственный независимый поток
+        workers: Количество процессов (None - последовательная генерация,
+                 0 или меньше - все доступные ядра)
+        task_size: Количество строк в одной параллельной задаче
+        n_features: Количество признаков в каждом векторе
+        packed: Если True, генерирует и сохраняет упакованные биты (uint8)
         
     Возвращает:
-        Кортеж (список массивов с выборками, список путей к сохранённым файлам)
+        Кортеж (список массивов с выборками, список путей к сохранённым файлам).
+        В параллельном режиме массивы открыты через np.load(mmap_mode='r')
     """
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     
     samples = []
     file_paths = []
+    vector_rngs = spawn_rngs(rng, n_vectors)
+    suffix = "_packed" if packed else ""
+    
+    if workers is not None:
+        tasks = []
+        for i, vector_rng in enumerate(vector_rngs):
+            file_path = output_dir / f"binary_sample_{i+1}{suffix}.npy"
+            if packed:
+                dtype, shape = np.uint8, (n_samples, packed_width(n_features))
+            else:
+                dtype, shape = np.int64, (n_samples, n_features)
+            np.lib.format.open_memmap(file_path, mode='w+', dtype=dtype, shape=shape).flush()
+            file_paths.append(str(file_path))
+            
+            rows = _split_rows(n_samples, task_size)
+            for (start, stop), chunk_rng in zip(rows, spawn_rngs(vector_rng, len(rows))):
+                tasks.append((str(file_path), start, stop, probability, n_features, packed, chunk_rng))
+        
+        with stage('generate'):
+            _run_tasks(_binary_chunk_task, tasks, workers)
+        count('rows_generated', n_samples * n_vectors)
+        samples = [np.load(file_path, mmap_mode='r') for file_path in file_paths]
+        count('bytes_written', sum(sample.nbytes for sample in samples))
+        return samples, file_paths
     
-    for i in range(n_vectors):
+    for i, vector_rng in enumerate(vector_rngs):
         # Генерация бинарной выборки
-        sample = np.random.binomial(1, probability, (n_samples, 2))
+        with stage('generate'):
+            sample = generate_binary_vector(n_samples, probability, n_features, packed, vector_rng)
+        count('rows_generated', len(sample))
         samples.append(sample)
         
         # Сохранение в файл
-        file_path = output_dir / f"binary_sample_{i+1}.npy"
-        np.save(file_path, sample)
+        file_path = output_dir / f"binary_sample_{i+1}{suffix}.npy"
+        with stage('save'):
+            np.save(file_path, sample)
+        count('bytes_written', sample.nbytes)
         file_paths.append(str(file_path))
     
     return samples, file_paths
+
+def generate_normal_dataset(
+    means: List[np.ndarray],
+    covs: List[CovarianceLike],
+    n_samples: int,
+    path: Union[str, Path],
+    use_clt: bool = True,
+    rng: RandomLike = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    overwrite: bool = False,
+    source: Optional[NormalSourceLike] = None
+) -> SampleDataset:
+    """
+    Генерирует нормальные выборки всех классов в один набор данных (см. src/dataset.py).
+    
+    Классы получают метки 0..K-1 и те же независимые потоки случайных
+    чисел, что и в generate_normal_samples; истинные параметры и зерно
+    записываются в манифест. Генерация идёт блоками при постоянном объёме памяти.
+    
+    Аргументы:
+        means: Список векторов математических ожиданий
+        covs: Список ковариационных матриц или их разложений (проверяются до генерации)
+        n_samples: Количество сэмплов для каждого класса
+        path: Директория набора данных
+        use_clt: Если True, использует ЦПТ для генерации нормальных величин
+        rng: Генератор случайных чисел или зерно
+        chunk_size: Количество векторов в одном блоке
+        overwrite: Если True, существующий набор перезаписывается
+        source: Источник нормальных величин (см. generate_normal_samples)
+        
+    Возвращает:
+        Открытый набор данных
+    """
+    rng, seed = recordable_seed(rng)
+    source = _resolve_source(source, use_clt)
+    covs = [validate_covariance(cov) for cov in covs]
+    dataset = SampleDataset.create(
+        path,
+        n_features=len(means[0]),
+        dtype=np.float64,
+        seed=seed,
+        metadata={
+            'generator': 'normal',
+            'use_clt': use_clt,
+            'source': None if source is None else source.label,
+            'chunk_size': chunk_size
+        },
+        overwrite=overwrite
+    )
+    
+    for i, (mean, cov, class_rng) in enumerate(zip(means, covs, spawn_rngs(rng, len(means)))):
+        dataset.add_class(i, mean, as_matrix(cov), n_samples=n_samples)
+        blocks = iter_normal_samples(mean, cov, n_samples, chunk_size, use_clt, class_rng, source)
+        dataset.append_stream(blocks, i)
+    
+    return dataset
+
+def generate_binary_dataset(
+    n_samples: int,
+    probability: float,
+    n_vectors: int,
+    path: Union[str, Path],
+    n_features: int = 2,
+    packed: bool = False,
+    rng: RandomLike = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    overwrite: bool = False
+) -> SampleDataset:
+    """
+    Генерирует бинарные выборки в один набор данных (см. src/dataset.py).
+    
+    Векторы хранятся как uint8 (0/1) или в упакованном виде; в последнем
+    случае число столбцов набора равно ceil(n_features / 8), а исходное
+    количество признаков записывается в метаданные ('n_bits').
+    
+    Аргументы:
+        n_samples: Количество сэмплов в каждой выборке
+        probability: Вероятность успеха (1)
+        n_vectors: Количество генерируемых векторов (классов)
+        path: Директория набора данных
+        n_features: Количество признаков в каждом векторе
+        packed: Если True, хранит упакованные биты
+        rng: Генератор случайных чисел или зерно
+        chunk_size: Количество векторов в одном блоке
+        overwrite: Если True, существующий набор перезаписывается
+        
+    Возвращает:
+        Открытый набор данных
+    """
+    rng, seed = recordable_seed(rng)
+    dataset = SampleDataset.create(
+        path,
+        n_features=packed_width(n_features) if packed else n_features,
+        dtype=np.uint8,
+        seed=seed,
+        metadata={
+            'generator': 'binary',
+            'probability': probability,
+            'packed': packed,
+            'n_bits': n_features,
+            'chunk_size': chunk_size,
+        },
+        overwrite=overwrite
+    )
+    
+    for i, vector_rng in enumerate(spawn_rngs(rng, n_vectors)):
+        dataset.add_class(i, probability=probability, n_samples=n_samples)
+        blocks = (
+            generate_binary_vector(stop - start, probability, n_features, packed, vector_rng)
+            for start, stop in _split_rows(n_samples, chunk_size)
+        )
+        dataset.append_stream(blocks, i)
+    
+    return dataset
@@ -0,0 +1,302 @@
+"""
+Контейнер для наборов данных из нескольких классов.
+
+Набор данных - это директория с тремя файлами:
+- manifest.json: размерность, тип данных, зерно, параметры классов
+  (истинные мат. ожидание и ковариация) и список блоков;
+- data.bin: все векторы подряд в построчном порядке;
+- labels.bin: метка класса каждой строки (int32).
+
+Блоки дописываются в конец файлов, чтение идёт через np.memmap без
+копирования, поэтому срез любого класса 100-классового набора открывает
+один файл, а не сотню.
+
+Манифест - единственный источник истины о числе строк: он заменяется
+атомарно после того, как данные записаны на диск. Чтение отображает
+только первые n_rows строк манифеста, а строки, дописанные перед сбоем
+и не попавшие в манифест, отрезаются перед следующей дозаписью.
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+MANIFEST_NAME = 'manifest.json'
+DATA_NAME = 'data.bin'
+LABELS_NAME = 'labels.bin'
+LABEL_DTYPE = np.int32
+FORMAT_VERSION = 1
+
+
+class SampleDataset:
+    """
+    Дописываемый набор данных с метками классов и манифестом.
+
+    Создаётся через SampleDataset.create, открывается конструктором.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Открывает существующий набор данных.
+
+        Аргументы:
+            path: Путь к директории набора данных
+        """
+        self.path = Path(path)
+        with open(self.path / MANIFEST_NAME, encoding='utf-8') as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        if self.manifest.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия формата в {self.path}")
+        self._data = None
+        self._labels = None
+
+    def _truncate_to_manifest(self) -> None:
+        """Отрезает строки, дописанные после последней записи манифеста (прерванная запись)."""
+        n_rows = self.manifest['n_rows']
+        row_bytes = {
+            DATA_NAME: self.manifest['n_features'] * np.dtype(self.manifest['dtype']).itemsize,
+            LABELS_NAME: np.dtype(LABEL_DTYPE).itemsize,
+        }
+        for name, size in row_bytes.items():
+            expected = n_rows * size
+            actual = os.path.getsize(self.path / name)
+            if actual < expected:
+                raise ValueError(
+                    f"Файл {self.path / name} короче манифеста: {actual} байт вместо {expected}"
+                )
+            if actual > expected:
+                os.truncate(self.path / name, expected)
+
+    @classmethod
+    def create(
+        cls,
+        path: Union[str, Path],
+        n_features: int,
+        dtype: Any = np.float64,
+        seed: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        overwrite: bool = False
+    ) -> 'SampleDataset':
+        """
+        Создаёт пустой набор данных.
+
+        Аргументы:
+            path: Путь к директории набора данных
+            n_features: Количество признаков (столбцов)
+            dtype: Тип данных векторов
+            seed: Зерно, из которого сгенерирован набор (для воспроизводимости)
+            metadata: Произвольные параметры генерации
+            overwrite: Если True, существующий набор удаляется
+
+        Возвращает:
+            Открытый набор данных
+        """
+        path = Path(path)
+        if path.exists():
+            if not overwrite:
+                raise FileExistsError(f"Набор данных {path} уже существует")
+            shutil.rmtree(path)
+        path.mkdir(parents=True)
+
+        (path / DATA_NAME).touch()
+        (path / LABELS_NAME).touch()
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'n_features': int(n_features),
+            'dtype': np.dtype(dtype).str,
+            'seed': seed,
+            'n_rows': 0,
+            'metadata': metadata or {},
+            'classes': [],
+            'chunks': [],
+        }
+        _write_manifest(path, manifest)
+        return cls(path)
+
+    # ---------- запись ----------
+
+    def add_class(
+        self,
+        label: int,
+        mean: Optional[np.ndarray] = None,
+        cov: Optional[np.ndarray] = None,
+        **params: Any
+    ) -> None:
+        """
+        Регистрирует класс и его истинные параметры в манифесте.
+
+        Аргументы:
+            label: Метка класса
+            mean: Истинное мат. ожидание
+            cov: Истинная ковариационная матрица
+            **params: Прочие параметры генерации (сериализуемые в JSON)
+        """
+        if self._class_entry(label) is not None:
+            raise ValueError(f"Класс {label} уже зарегистрирован")
+        self.manifest['classes'].append({
+            'label': int(label),
+            'mean': None if mean is None else np.asarray(mean, dtype=float).ravel().tolist(),
+            'cov': None if cov is None else np.asarray(cov, dtype=float).tolist(),
+            'n_rows': 0,
+            'params': params,
+        })
+        _write_manifest(self.path, self.manifest)
+
+    def append(self, block: np.ndarray, label: int) -> None:
+        """
+        Дописывает блок векторов одного класса в конец набора.
+
+        Аргументы:
+            block: Матрица (n_rows, n_features)
+            label: Метка класса (регистрируется автоматически, если не было add_class)
+        """
+        self.append_stream([block], label)
+
+    def append_stream(self, blocks: Iterable[np.ndarray], label: int) -> None:
+        """
+        Дописывает поток блоков одного класса; манифест обновляется один раз в конце.
+
+        Данные сбрасываются на диск до записи манифеста; при ошибке в потоке
+        манифест фиксирует блоки, записанные до неё.
+
+        Аргументы:
+            blocks: Итератор матриц (n_rows, n_features)
+            label: Метка класса
+        """
+        if self._class_entry(label) is None:
+            self.add_class(label)
+        entry = self._class_entry(label)
+        dtype = np.dtype(self.manifest['dtype'])
+        n_features = self.manifest['n_features']
+        # Остатки прерванной записи иначе сдвинули бы новые строки
+        self._truncate_to_manifest()
+
+        try:
+            with open(self.path / DATA_NAME, 'ab') as data_file, open(self.path / LABELS_NAME, 'ab') as labels_file:
+                try:
+                    for block in blocks:
+                        block = np.ascontiguousarray(block, dtype=dtype)
+                        if block.ndim != 2 or block.shape[1] != n_features:
+                            raise ValueError(f"Ожидался блок (n, {n_features}), получена форма {block.shape}")
+                        block.tofile(data_file)
+                        np.full(len(block), label, dtype=LABEL_DTYPE).tofile(labels_file)
+
+                        start = self.manifest['n_rows']
+                        self.manifest['n_rows'] = start + len(block)
+                        self.manifest['chunks'].append({'label': int(label), 'start': start, 'stop': start + len(block)})
+                        entry['n_rows'] += len(block)
+                finally:
+                    # Манифест не должен ссылаться на строки, которых ещё нет на диске
+                    for f in (data_file, labels_file):
+                        f.flush()
+                        os.fsync(f.fileno())
+        finally:
+            # Старые отображения не видят дописанные строки
+            self._data = None
+            self._labels = None
+            _write_manifest(self.path, self.manifest)
+
+    # ---------- чтение ----------
+
+    def __len__(self) -> int:
+        return self.manifest['n_rows']
+
+    @property
+    def n_features(self) -> int:
+        return self.manifest['n_features']
+
+    @property
+    def n_chunks(self) -> int:
+        return len(self.manifest['chunks'])
+
+    @property
+    def classes(self) -> List[int]:
+        """Метки зарегистрированных классов."""
+        return [entry['label'] for entry in self.manifest['classes']]
+
+    @property
+    def data(self) -> np.ndarray:
+        """Все векторы (n_rows, n_features) как np.memmap только для чтения."""
+        if self._data is None:
+            self._data = self._memmap(DATA_NAME, self.manifest['dtype'], (len(self), self.n_features))
+        return self._data
+
+    @property
+    def labels(self) -> np.ndarray:
+        """Метки классов всех строк (n_rows,) как np.memmap только для чтения."""
+        if self._labels is None:
+            self._labels = self._memmap(LABELS_NAME, LABEL_DTYPE, (len(self),))
+        return self._labels
+
+    def chunk(self, index: int) -> Tuple[np.ndarray, int]:
+        """
+        Возвращает блок по номеру без копирования.
+
+        Аргументы:
+            index: Номер блока в порядке записи
+
+        Возвращает:
+            Кортеж (матрица блока, метка класса)
+        """
+        info = self.manifest['chunks'][index]
+        return self.data[info['start']:info['stop']], info['label']
+
+    def class_data(self, label: int) -> np.ndarray:
+        """
+        Возвращает все векторы класса.
+
+        Если блоки класса лежат подряд (обычный случай при генерации
+        класса за один проход), возвращается отображение без копирования.
+
+        Аргументы:
+            label: Метка класса
+
+        Возвращает:
+            Матрица (n_rows_class, n_features)
+        """
+        ranges = [(c['start'], c['stop']) for c in self.manifest['chunks'] if c['label'] == label]
+        if not ranges:
+            return self.data[:0]
+
+        contiguous = all(prev[1] == cur[0] for prev, cur in zip(ranges, ranges[1:]))
+        if contiguous:
+            return self.data[ranges[0][0]:ranges[-1][1]]
+        return np.concatenate([self.data[start:stop] for start, stop in ranges])
+
+    def class_parameters(self, label: int) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """
+        Возвращает истинные параметры класса из манифеста.
+
+        Возвращает:
+            Кортеж (мат. ожидание, ковариационная матрица); None, если не заданы
+        """
+        entry = self._class_entry(label)
+        if entry is None:
+            raise KeyError(label)
+        mean = None if entry['mean'] is None else np.array(entry['mean'])
+        cov = None if entry['cov'] is None else np.array(entry['cov'])
+        return mean, cov
+
+    def _class_entry(self, label: int) -> Optional[Dict[str, Any]]:
+        for entry in self.manifest['classes']:
+            if entry['label'] == label:
+                return entry
+        return None
+
+    def _memmap(self, name: str, dtype: Any, shape: Tuple[int, ...]) -> np.ndarray:
+        if shape[0] == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.path / name, dtype=dtype, mode='r', shape=shape)
+
+
+def _write_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+    """Атомарно записывает манифест (через временный файл)."""
+    tmp_path = path / (MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path / MANIFEST_NAME)
@@ -4,26 +4,41 @@ Implementation of multivariate normal distribution operations.
 import numpy as np
 from typing import Tuple, List
 
+from .covariance import CovarianceFactor, CovarianceLike, as_factor
+from .normal_sources import NormalSourceLike, as_source
+from .rng import RandomLike, make_rng
 
-def generate_multivariate_normal(mean: np.ndarray, cov: np.ndarray, n_samples: int = 1) -> np.ndarray:
+
+def generate_multivariate_normal(
+    mean: np.ndarray,
+    cov: CovarianceLike,
+    n_samples: int = 1,
+    rng: RandomLike = None,
+    source: NormalSourceLike = 'ziggurat'
+) -> np.ndarray:
     """
     Generate samples from a multivariate normal distribution using Cholesky decomposition.
     
     Args:
         mean: Mean vector of the distribution (n_features,)
-        cov: Covariance matrix (n_features, n_features)
+        cov: Covariance matrix (n_features, n_features) or a precomputed CovarianceFactor;
+             raw matrices are only factorized here, check them up front with validate_covariance
         n_samples: Number of samples to generate
+        rng: Random generator or seed
+        source: Standard normal source ('ziggurat', 'box_muller', 'clt', 'clt-<terms>'),
+                see src/normal_sources.py
         
     Returns:
         Array of shape (n_samples, n_features)
     """
+    rng = make_rng(rng)
     n_features = len(mean)
     
     # Generate standard normal samples
-    z = np.random.standard_normal((n_samples, n_features))
+    z = as_source(source).standard_normal((n_samples, n_features), rng)
     
-    # Perform Cholesky decomposition
-    L = np.linalg.cholesky(cov)
+    # Decompose (reused if cov is already factorized)
+    L = as_factor(cov).L
     
     # Transform to desired distribution
     samples = mean + np.dot(z, L.T)
@@ -47,50 +62,54 @@ def estimate_parameters(samples: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
     return mean, cov
 
 
-def mahalanobis_distance(x: np.ndarray, y: np.ndarray, cov: np.ndarray) -> float:
+def mahalanobis_distance(x: np.ndarray, y: np.ndarray, cov: CovarianceLike) -> float:
     """
     Calculate Mahalanobis distance between two points.
     
+    Uses a triangular solve with the Cholesky factor instead of an explicit inverse.
+    
     Args:
         x: First point (n_features,)
         y: Second point (n_features,)
-        cov: Covariance matrix (n_features, n_features)
+        cov: Covariance matrix (n_features, n_features) or a precomputed CovarianceFactor
         
     Returns:
         Mahalanobis distance
     """
     diff = x - y
-    inv_cov = np.linalg.inv(cov)
-    return np.sqrt(np.dot(np.dot(diff.T, inv_cov), diff))
+    return np.sqrt(as_factor(cov).mahalanobis_squared(diff))
 
 
 def bhattacharyya_distance(
     mean1: np.ndarray, 
-    cov1: np.ndarray, 
+    cov1: CovarianceLike, 
     mean2: np.ndarray, 
-    cov2: np.ndarray
+    cov2: CovarianceLike
 ) -> float:
     """
     Calculate Bhattacharyya distance between two multivariate normal distributions.
     
+    Log-determinants come from Cholesky factors, so the result stays finite
+    in high dimensions where raw determinants underflow or overflow.
+    
     Args:
         mean1: Mean of first distribution (n_features,)
-        cov1: Covariance of first distribution (n_features, n_features)
+        cov1: Covariance of first distribution (n_features, n_features) or its CovarianceFactor
         mean2: Mean of second distribution (n_features,)
-        cov2: Covariance of second distribution (n_features, n_features)
+        cov2: Covariance of second distribution (n_features, n_features) or its CovarianceFactor
         
     Returns:
         Bhattacharyya distance
     """
+    factor1 = as_factor(cov1)
+    factor2 = as_factor(cov2)
+    
     # Average covariance
-    cov_avg = (cov1 + cov2) / 2
+    factor_avg = CovarianceFactor((factor1.cov + factor2.cov) / 2)
     diff = mean1 - mean2
     
     # Calculate the terms
-    term1 = 0.125 * np.dot(np.dot(diff.T, np.linalg.inv(cov_avg)), diff)
-    det_cov1 = np.linalg.det(cov1)
-    det_cov2 = np.linalg.det(cov2)
-    det_avg = np.linalg.det(cov_avg)
-    term2 = 0.5 * np.log(det_avg / np.sqrt(det_cov1 * det_cov2))
+    term1 = 0.125 * factor_avg.mahalanobis_squared(diff)
+    term2 = 0.5 * (factor_avg.logdet - 0.5 * (factor1.logdet + factor2.logdet))
     
     return term1 + term2
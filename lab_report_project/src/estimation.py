@@ -0,0 +1,174 @@
+"""
+Потоковая оценка параметров распределений.
+
+OnlineGaussianEstimator накапливает мат. ожидание и ковариацию по блокам
+и объединяет частичные оценки из разных процессов.
+
+Файлы .npy открываются один раз через mmap_mode='r' и обрабатываются
+блоками за один проход, поэтому размер выборки не ограничен объёмом
+оперативной памяти. Результат кэшируется по (путь, mtime, размер файла).
+"""
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from .instrumentation import timed
+
+# Количество векторов, обрабатываемых за один проход
+DEFAULT_CHUNK_SIZE = 65536
+
+
+def _merge_moments(
+    n_a: int,
+    mean_a: np.ndarray,
+    m2_a: np.ndarray,
+    n_b: int,
+    mean_b: np.ndarray,
+    m2_b: np.ndarray
+) -> Tuple[int, np.ndarray, np.ndarray]:
+    """
+    Объединяет моменты двух частей выборки (формула Чана).
+
+    Возвращает:
+        Кортеж (объём, среднее, матрица сумм произведений отклонений)
+    """
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    mean = mean_a + delta * (n_b / n)
+    m2 = m2_a + m2_b + np.outer(delta, delta) * (n_a * n_b / n)
+    return n, mean, m2
+
+
+class OnlineGaussianEstimator:
+    """
+    Инкрементальная оценка мат. ожидания и ковариационной матрицы.
+
+    Статистики накапливаются по блокам (update) и объединяются между
+    независимыми экземплярами (merge) по формуле Чана, поэтому выборку
+    не нужно держать в памяти целиком, а частичные оценки из разных
+    процессов можно свести в одну. Результат совпадает с
+    np.mean / np.cov с точностью до ошибок округления.
+    """
+
+    def __init__(self, n_features: Optional[int] = None):
+        """
+        Аргументы:
+            n_features: Размерность векторов (по умолчанию определяется по первому блоку)
+        """
+        self.n = 0
+        self.mean = None if n_features is None else np.zeros(n_features)
+        self.m2 = None if n_features is None else np.zeros((n_features, n_features))
+
+    def update(self, batch: np.ndarray) -> 'OnlineGaussianEstimator':
+        """
+        Добавляет блок наблюдений.
+
+        Аргументы:
+            batch: Массив размера (n_samples, n_features) или один вектор
+
+        Возвращает:
+            Этот же оценщик (для цепочек вызовов)
+        """
+        batch = np.atleast_2d(np.asarray(batch, dtype=float))
+        if len(batch) == 0:
+            return self
+        if self.mean is None:
+            self.mean = np.zeros(batch.shape[1])
+            self.m2 = np.zeros((batch.shape[1], batch.shape[1]))
+
+        batch_mean = batch.mean(axis=0)
+        centered = batch - batch_mean
+        self.n, self.mean, self.m2 = _merge_moments(
+            self.n, self.mean, self.m2, len(batch), batch_mean, centered.T @ centered
+        )
+        return self
+
+    def merge(self, other: 'OnlineGaussianEstimator') -> 'OnlineGaussianEstimator':
+        """
+        Добавляет статистики другого оценщика (например, из другого процесса).
+
+        Аргументы:
+            other: Оценщик, накопленный по другой части выборки
+
+        Возвращает:
+            Этот же оценщик (для цепочек вызовов)
+        """
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.m2 = other.n, other.mean.copy(), other.m2.copy()
+            return self
+
+        self.n, self.mean, self.m2 = _merge_moments(
+            self.n, self.mean, self.m2, other.n, other.mean, other.m2
+        )
+        return self
+
+    def finalize(self, ddof: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Возвращает итоговые оценки.
+
+        Аргументы:
+            ddof: Поправка на число степеней свободы (1 - как np.cov, 0 - деление на N)
+
+        Возвращает:
+            Кортеж (оценка мат. ожидания, оценка ковариационной матрицы)
+        """
+        if self.n <= ddof:
+            raise ValueError(f"Недостаточно наблюдений для оценки: {self.n}")
+        return self.mean.copy(), self.m2 / (self.n - ddof)
+
+
+@lru_cache(maxsize=128)
+@timed('estimate')
+def _file_moments(
+    path: str,
+    mtime_ns: int,
+    size: int,
+    samples_axis: int,
+    chunk_size: int
+) -> OnlineGaussianEstimator:
+    """Однопроходный подсчёт моментов файла; mtime_ns и size входят в ключ кэша."""
+    data = np.load(path, mmap_mode='r')
+    if data.ndim != 2:
+        raise ValueError(f"Ожидался двумерный массив в {path}, получена форма {data.shape}")
+    n_samples = data.shape[samples_axis]
+
+    estimator = OnlineGaussianEstimator(data.shape[1 - samples_axis])
+    for start in range(0, n_samples, chunk_size):
+        stop = min(start + chunk_size, n_samples)
+        estimator.update(data[start:stop] if samples_axis == 0 else data[:, start:stop].T)
+
+    return estimator
+
+
+def estimate_file_parameters(
+    data_file: Union[str, Path],
+    samples_axis: int = 0,
+    ddof: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Оценивает мат. ожидание и ковариационную матрицу по файлу .npy.
+
+    Повторный вызов для неизменённого файла не читает его с диска.
+
+    Аргументы:
+        data_file: Путь к файлу с двумерным массивом
+        samples_axis: Ось, вдоль которой расположены наблюдения
+                      (0 - строки, как в src; 1 - столбцы, как в lab1_final)
+        ddof: Поправка на число степеней свободы (1 - несмещённая оценка, 0 - деление на N)
+        chunk_size: Количество наблюдений, обрабатываемых за один проход
+
+    Возвращает:
+        Кортеж (оценка мат. ожидания, оценка ковариационной матрицы)
+    """
+    path = os.path.abspath(data_file)
+    stat = os.stat(path)
+    estimator = _file_moments(path, stat.st_mtime_ns, stat.st_size, samples_axis, chunk_size)
+
+    # finalize возвращает копии, поэтому кэш не испортить
+    return estimator.finalize(ddof)
@@ -0,0 +1,330 @@
+"""
+Декларативные эксперименты: сетка параметров из файла конфигурации.
+
+Конфигурация (JSON или TOML) задаёт базовые параметры и сетку значений;
+каждая комбинация сетки - отдельный эксперимент: генерация выборок
+классов, оценка параметров, расстояния между классами и (по желанию)
+отчёт. Пример конфигурации - configs/example.json.
+
+Эксперименты разбиваются на задачи «сгенерировать и оценить один класс»;
+одинаковые задачи разных экспериментов (те же параметры класса, объём,
+метод и поток случайных чисел) выполняются один раз. Задачи
+распределяются по пулу процессов, результаты собираются в одну
+сводную таблицу summary.csv (строка на пару классов эксперимента).
+"""
+import csv
+import itertools
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .analysis import pairwise_distances
+from .cache import ResultCache, params_digest
+from .covariance import CovarianceLike, validate_covariance
+from .data_generation import DEFAULT_CHUNK_SIZE, _resolve_workers, iter_normal_samples, write_chunks
+from .estimation import OnlineGaussianEstimator
+from .rng import make_rng, stream_rng
+
+# Параметры эксперимента по умолчанию
+DEFAULT_PARAMS: Dict[str, Any] = {
+    'n_samples': 200,
+    'n_features': 2,
+    'n_classes': 2,
+    # 'identity', 'diagonal', 'equal' (общая случайная) или 'random' (своя у каждого класса)
+    'covariance': 'random',
+    # Масштаб разброса центров классов
+    'separation': 2.0,
+    'use_clt': True,
+    # Источник нормальных величин ('clt-50', 'box_muller', 'ziggurat', см. normal_sources);
+    # None - по use_clt
+    'source': None,
+    'seed': 0,
+}
+
+COVARIANCE_STRUCTURES = ('identity', 'diagonal', 'equal', 'random')
+
+METRICS = ('mahalanobis', 'bhattacharyya')
+
+
+def load_config(path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Читает конфигурацию эксперимента.
+
+    Аргументы:
+        path: Путь к файлу .json или .toml
+
+    Возвращает:
+        Словарь конфигурации
+    """
+    path = Path(path)
+    if path.suffix == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            # До Python 3.11 - сторонний пакет с тем же интерфейсом
+            import tomli as tomllib
+
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def expand_grid(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Разворачивает сетку параметров в список экспериментов.
+
+    Аргументы:
+        config: Конфигурация с разделами 'params' (общие значения) и
+                'grid' (списки значений, перебираются все комбинации)
+
+    Возвращает:
+        Список словарей параметров, по одному на эксперимент
+    """
+    base = {**DEFAULT_PARAMS, **config.get('params', {})}
+    grid = config.get('grid', {})
+    keys = list(grid)
+    experiments = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        params = {**base, **dict(zip(keys, values))}
+        if 'classes' in params:
+            # Параметры синтеза классов к явно заданным классам не относятся
+            params.pop('covariance', None)
+            params.pop('separation', None)
+            params['n_classes'] = len(params['classes'])
+            params['n_features'] = len(params['classes'][0]['mean'])
+        experiments.append(params)
+    return experiments
+
+
+def experiment_id(params: Dict[str, Any]) -> str:
+    """Короткий идентификатор эксперимента по его параметрам."""
+    return params_digest(params)[:12]
+
+
+def class_parameters(params: Dict[str, Any]) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """
+    Истинные параметры классов эксперимента.
+
+    Явно заданные классы ('classes': [{'mean': ..., 'cov': ...}, ...])
+    используются как есть. Иначе параметры i-го класса выбираются из
+    собственного потока случайных чисел (seed, i), так что класс i
+    одинаков во всех экспериментах с тем же seed, размерностью и
+    структурой ковариации - это и позволяет не генерировать его повторно.
+
+    Аргументы:
+        params: Параметры эксперимента
+
+    Возвращает:
+        Кортеж (список мат. ожиданий, список ковариационных матриц)
+    """
+    if 'classes' in params:
+        means = [np.asarray(c['mean'], dtype=float) for c in params['classes']]
+        covs = [np.asarray(c['cov'], dtype=float) for c in params['classes']]
+        return means, covs
+
+    structure = params['covariance']
+    if structure not in COVARIANCE_STRUCTURES:
+        raise ValueError(
+            f"Неизвестная структура ковариации '{structure}', "
+            f"доступны: {', '.join(COVARIANCE_STRUCTURES)}"
+        )
+    n_features = params['n_features']
+
+    def random_cov(rng: np.random.Generator) -> np.ndarray:
+        # Случайная корреляционная структура с собственными числами не меньше 0.5
+        a = rng.standard_normal((n_features, n_features))
+        return a @ a.T / n_features + 0.5 * np.eye(n_features)
+
+    means = []
+    covs = []
+    for i in range(params['n_classes']):
+        # Поток параметров отделён от потока выборки stream_rng(seed, i)
+        rng = make_rng(np.random.SeedSequence([params['seed'], i]))
+        means.append(params['separation'] * rng.standard_normal(n_features))
+        if structure == 'identity':
+            covs.append(np.eye(n_features))
+        elif structure == 'diagonal':
+            covs.append(np.diag(rng.uniform(0.5, 2.0, n_features)))
+        elif structure == 'equal':
+            covs.append(random_cov(make_rng(np.random.SeedSequence([params['seed']]))))
+        else:
+            covs.append(random_cov(rng))
+    return means, covs
+
+
+def _sample_task(
+    mean: np.ndarray,
+    cov: CovarianceLike,
+    n_samples: int,
+    use_clt: bool,
+    source: Optional[str],
+    seed: int,
+    index: int,
+    sample_path: Optional[str]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Генерирует выборку одного класса потоково и оценивает её параметры.
+
+    Выборка целиком в памяти не хранится; при заданном sample_path
+    она записывается в .npy.
+    """
+    estimator = OnlineGaussianEstimator(len(mean))
+    blocks = iter_normal_samples(
+        mean, cov, n_samples, DEFAULT_CHUNK_SIZE, use_clt, stream_rng(seed, index), source
+    )
+
+    def observed(blocks):
+        for block in blocks:
+            estimator.update(block)
+            yield block
+
+    if sample_path is None:
+        for _ in observed(blocks):
+            pass
+    else:
+        write_chunks(observed(blocks), sample_path, (n_samples, len(mean)))
+    return estimator.finalize()
+
+
+def _write_summary(rows: List[Dict[str, Any]], path: Path) -> None:
+    """Записывает сводную таблицу в CSV (столбцы - объединение ключей всех строк)."""
+    fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def run_experiments(
+    config: Dict[str, Any],
+    output_dir: Optional[Union[str, Path]] = None,
+    workers: Optional[int] = None,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Выполняет все эксперименты сетки.
+
+    Аргументы:
+        config: Конфигурация (см. load_config). Помимо 'params' и 'grid'
+                поддерживаются ключи:
+                'output_dir' - директория результатов,
+                'workers' - количество процессов,
+                'metrics' - расстояния из METRICS,
+                'save_samples' - сохранять выборки в .npy,
+                'report' - строить Markdown отчёт для каждого эксперимента,
+                'cache_dir' - кэш оценок между запусками (см. ResultCache)
+        output_dir: Переопределяет config['output_dir']
+        workers: Переопределяет config['workers'] (None - в текущем процессе,
+                 0 или меньше - все доступные ядра)
+        dry_run: Если True, только подсчитывает эксперименты и задачи
+
+    Возвращает:
+        Словарь с ключами 'n_experiments', 'n_tasks' (уникальных задач),
+        'n_cached' (задач, взятых из кэша) и 'summary' (путь к summary.csv)
+    """
+    output_dir = Path(output_dir or config.get('output_dir', 'results'))
+    workers = config.get('workers') if workers is None else workers
+    metrics = config.get('metrics', list(METRICS))
+    for metric in metrics:
+        if metric not in METRICS:
+            raise ValueError(f"Неизвестная метрика '{metric}', доступны: {', '.join(METRICS)}")
+    save_samples = config.get('save_samples', False)
+
+    experiments = expand_grid(config)
+
+    # Задачи по классам; одинаковые задачи разных экспериментов совпадают по ключу
+    tasks: Dict[str, Tuple[Any, ...]] = {}
+    experiment_tasks = []
+    for params in experiments:
+        means, covs = class_parameters(params)
+        # Матрицы всех экспериментов проверяются до запуска задач; разложения
+        # передаются задачам и расчёту расстояний
+        for index, cov in enumerate(covs):
+            try:
+                covs[index] = validate_covariance(cov)
+            except ValueError as error:
+                raise ValueError(f"Эксперимент {experiment_id(params)}, класс {index + 1}: {error}") from None
+        keys = []
+        for index, (mean, cov) in enumerate(zip(means, covs)):
+            task = (
+                mean, cov, params['n_samples'], params['use_clt'], params['source'], params['seed'], index
+            )
+            key = params_digest(list(task))
+            keys.append(key)
+            tasks.setdefault(key, task)
+        experiment_tasks.append((params, means, covs, keys))
+
+    result = {'n_experiments': len(experiments), 'n_tasks': len(tasks), 'n_cached': 0, 'summary': None}
+    if dry_run:
+        return result
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    samples_dir = output_dir / 'samples'
+    if save_samples:
+        samples_dir.mkdir(exist_ok=True)
+
+    cache = ResultCache(config['cache_dir']) if config.get('cache_dir') else None
+    estimates: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    if cache is not None and not save_samples:
+        for key in tasks:
+            entry = cache.get(cache.key('experiment_class', task=key))
+            if entry is not None:
+                estimates[key] = (entry['mean'], entry['cov'])
+        result['n_cached'] = len(estimates)
+
+    pending = [key for key in tasks if key not in estimates]
+    arguments = [
+        tasks[key] + (str(samples_dir / f"{key[:16]}.npy") if save_samples else None,)
+        for key in pending
+    ]
+    n_workers = 1 if workers is None else min(_resolve_workers(workers), max(len(pending), 1))
+    if n_workers == 1:
+        computed = [_sample_task(*args) for args in arguments]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            # Задачи мелкие, пачки снижают накладные расходы на передачу
+            chunksize = max(1, len(arguments) // (4 * n_workers))
+            computed = list(executor.map(_sample_task, *zip(*arguments), chunksize=chunksize))
+
+    for key, estimate in zip(pending, computed):
+        estimates[key] = estimate
+        if cache is not None:
+            cache.put(cache.key('experiment_class', task=key), mean=estimate[0], cov=estimate[1])
+
+    rows = []
+    for params, means, covs, keys in experiment_tasks:
+        exp_id = experiment_id(params)
+        class_estimates = [estimates[key] for key in keys]
+        estimated = {metric: pairwise_distances(class_estimates, metric=metric) for metric in metrics}
+        true = {metric: pairwise_distances(list(zip(means, covs)), metric=metric) for metric in metrics}
+
+        scalar_params = {key: value for key, value in params.items() if key != 'classes'}
+        for i, j in zip(*np.triu_indices(len(keys), 1)):
+            row = {'experiment': exp_id, **scalar_params, 'class_i': int(i) + 1, 'class_j': int(j) + 1}
+            for metric in metrics:
+                row[metric] = float(estimated[metric][i, j])
+                row[f'{metric}_true'] = float(true[metric][i, j])
+            rows.append(row)
+
+        if config.get('report'):
+            from .report import ReportBuilder
+
+            builder = ReportBuilder(output_dir / 'reports' / f"{exp_id}.md")
+            builder.estimates(class_estimates)
+            builder.distances({
+                f"{metric} ({i + 1}, {j + 1})": estimated[metric][i, j]
+                for metric in metrics
+                for i, j in zip(*np.triu_indices(len(keys), 1))
+            })
+            if save_samples:
+                builder.data_files([str(samples_dir / f"{key[:16]}.npy") for key in keys])
+            builder.write()
+
+    summary_path = output_dir / 'summary.csv'
+    _write_summary(rows, summary_path)
+    result['summary'] = str(summary_path)
+    return result
@@ -0,0 +1,288 @@
+"""
+Замеры времени и счётчики по этапам конвейера.
+
+Этапы (генерация, сохранение, оценка, расстояния, графики, отчёт)
+размечены в коде блоками `with stage('имя'):` или декоратором
+@timed('имя'), счётчики (число сгенерированных строк, записанных байт,
+разложений матриц) - вызовами count('имя', значение). Пока замеры
+выключены, stage возвращает общий пустой контекст, а count сразу
+выходит, так что накладные расходы - одна проверка флага.
+
+Включение:
+- из кода: instrumentation.enable('timing' | 'cprofile' | 'tracemalloc');
+- переменной окружения LAB_INSTRUMENT=<режим> (для запуска без изменения
+  кода); если задана LAB_INSTRUMENT_OUTPUT=<префикс>, при выходе
+  главного процесса сохраняются <префикс>.json и <префикс>.csv.
+
+Режимы:
+- 'timing': время и число вызовов этапов, журнал событий;
+- 'cprofile': дополнительно профиль cProfile внешних этапов
+  (вложенные этапы попадают в профиль внешнего);
+- 'tracemalloc': дополнительно пик выделенной Python памяти по этапам.
+
+Замеры ведутся в каждом процессе отдельно; этапы, выполненные в
+рабочих процессах пула, в отчёт главного процесса не попадают.
+"""
+import atexit
+import csv
+import functools
+import json
+import multiprocessing
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar, Union
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+MODES = ('timing', 'cprofile', 'tracemalloc')
+
+ENV_MODE = 'LAB_INSTRUMENT'
+ENV_OUTPUT = 'LAB_INSTRUMENT_OUTPUT'
+
+_NULL_CONTEXT = nullcontext()
+
+_enabled = False
+_mode = 'timing'
+_origin = 0.0
+_stages: Dict[str, Dict[str, float]] = {}
+_counters: Dict[str, float] = {}
+_events: List[Dict[str, Any]] = []
+_profiles: Dict[str, Any] = {}
+# Открытые этапы: [имя, пик памяти, профилировщик]
+_stack: List[List[Any]] = []
+# True, если трассировку tracemalloc запустил этот модуль (чужую не останавливаем)
+_owns_tracemalloc = False
+
+
+def enable(mode: str = 'timing') -> None:
+    """
+    Включает замеры и сбрасывает накопленные данные.
+
+    Аргументы:
+        mode: 'timing', 'cprofile' или 'tracemalloc'
+    """
+    global _enabled, _mode, _origin, _owns_tracemalloc
+    if mode not in MODES:
+        raise ValueError(f"Неизвестный режим '{mode}', доступны: {', '.join(MODES)}")
+    reset()
+    _mode = mode
+    _origin = time.perf_counter()
+    if mode == 'tracemalloc':
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _owns_tracemalloc = True
+    _enabled = True
+
+
+def disable() -> None:
+    """
+    Выключает замеры (накопленные данные сохраняются до reset или enable).
+
+    Трассировка tracemalloc останавливается, только если её запустил enable.
+    """
+    global _enabled, _owns_tracemalloc
+    _enabled = False
+    if _owns_tracemalloc:
+        import tracemalloc
+
+        tracemalloc.stop()
+        _owns_tracemalloc = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Очищает накопленные замеры."""
+    _stages.clear()
+    _counters.clear()
+    _events.clear()
+    _profiles.clear()
+    _stack.clear()
+
+
+def count(name: str, value: float = 1) -> None:
+    """
+    Увеличивает счётчик.
+
+    Аргументы:
+        name: Имя счётчика ('rows_generated', 'bytes_written', ...)
+        value: Приращение
+    """
+    if not _enabled:
+        return
+    _counters[name] = _counters.get(name, 0) + value
+
+
+def stage(name: str) -> Any:
+    """
+    Контекст замера этапа: `with stage('generate'): ...`.
+
+    Аргументы:
+        name: Имя этапа
+
+    Возвращает:
+        Менеджер контекста (пустой, если замеры выключены)
+    """
+    if not _enabled:
+        return _NULL_CONTEXT
+    return _measure(name)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """
+    Декоратор: каждый вызов функции замеряется как этап name.
+
+    Аргументы:
+        name: Имя этапа
+    """
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _measure(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def _measure(name: str) -> Iterator[None]:
+    entry = [name, 0, None]
+    if _mode == 'tracemalloc':
+        import tracemalloc
+
+        # Пик внешнего этапа до начала вложенного сохраняется в нём самом
+        if _stack:
+            _stack[-1][1] = max(_stack[-1][1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    elif _mode == 'cprofile' and not any(e[2] is not None for e in _stack):
+        import cProfile
+
+        entry[2] = cProfile.Profile()
+        entry[2].enable()
+
+    _stack.append(entry)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _stack.pop()
+
+        stats = _stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+        stats['calls'] += 1
+        stats['seconds'] += elapsed
+        stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+
+        event = {
+            'name': name,
+            'ph': 'X',
+            'ts': (start - _origin) * 1e6,
+            'dur': elapsed * 1e6,
+            'pid': os.getpid(),
+            'tid': 0,
+        }
+        if _mode == 'tracemalloc':
+            import tracemalloc
+
+            peak = max(entry[1], tracemalloc.get_traced_memory()[1])
+            stats['peak_bytes'] = max(stats.get('peak_bytes', 0), peak)
+            event['args'] = {'peak_bytes': peak}
+            if _stack:
+                _stack[-1][1] = max(_stack[-1][1], peak)
+        elif entry[2] is not None:
+            entry[2].disable()
+            if name in _profiles:
+                _profiles[name].add(entry[2])
+            else:
+                import pstats
+
+                _profiles[name] = pstats.Stats(entry[2])
+        _events.append(event)
+
+
+def summary() -> Dict[str, Any]:
+    """
+    Возвращает накопленные замеры.
+
+    Возвращает:
+        Словарь с ключами 'mode', 'stages' (имя -> calls, seconds,
+        max_seconds и peak_bytes в режиме tracemalloc) и 'counters'
+    """
+    return {
+        'mode': _mode,
+        'stages': {name: dict(stats) for name, stats in _stages.items()},
+        'counters': dict(_counters),
+    }
+
+
+def export_json(path: Union[str, Path]) -> None:
+    """
+    Сохраняет замеры и журнал событий в JSON.
+
+    Журнал записан в формате Trace Event (ключ traceEvents) и
+    открывается в chrome://tracing или Perfetto.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({**summary(), 'traceEvents': _events}, f, ensure_ascii=False, indent=2)
+
+
+def export_csv(path: Union[str, Path]) -> None:
+    """Сохраняет сводку по этапам и счётчики в CSV (строка на этап или счётчик)."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['kind', 'name', 'calls', 'seconds', 'max_seconds', 'peak_bytes', 'value'])
+        for name, stats in _stages.items():
+            writer.writerow([
+                'stage', name, stats['calls'], stats['seconds'], stats['max_seconds'],
+                stats.get('peak_bytes', ''), ''
+            ])
+        for name, value in _counters.items():
+            writer.writerow(['counter', name, '', '', '', '', value])
+
+
+def export_profiles(output_dir: Union[str, Path]) -> List[str]:
+    """
+    Сохраняет профили cProfile по этапам (<этап>.prof, читаются pstats/snakeviz).
+
+    Возвращает:
+        Пути к сохранённым файлам
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name, stats in _profiles.items():
+        path = output_dir / f"{name}.prof"
+        stats.dump_stats(path)
+        paths.append(str(path))
+    return paths
+
+
+def _export_on_exit(prefix: str) -> None:
+    # Рабочие процессы пула наследуют переменные окружения, но отчёт пишет только главный
+    if multiprocessing.parent_process() is not None:
+        return
+    export_json(prefix + '.json')
+    export_csv(prefix + '.csv')
+    if _profiles:
+        export_profiles(prefix + '_profiles')
+
+
+def _enable_from_environment() -> None:
+    mode = os.environ.get(ENV_MODE)
+    if not mode:
+        return
+    enable('timing' if mode == '1' else mode)
+    output: Optional[str] = os.environ.get(ENV_OUTPUT)
+    if output:
+        atexit.register(_export_on_exit, output)
+
+
+_enable_from_environment()
@@ -0,0 +1,305 @@
+"""
+Источники стандартных нормальных величин для генераторов выборок.
+
+Все нормальные генераторы проекта получают стандартные нормальные
+величины от источника, выбранного параметром source:
+- 'clt' - сумма n_terms равномерных величин, нормированная по ЦПТ
+  ('clt' - 12 слагаемых, 'clt-50' - 50); распределение приближённое,
+  значения ограничены по модулю sqrt(3 * n_terms);
+- 'box_muller' - векторизованное преобразование Бокса-Мюллера
+  (две равномерные величины на две нормальные, точное распределение);
+- 'ziggurat' - Generator.standard_normal (алгоритм зиккурата numpy,
+  точное распределение, самый быстрый).
+
+compare_sources сравнивает источники по скорости и точности (моменты,
+хвосты P(|Z| > k), статистика Колмогорова), см. также
+benchmarks/bench_normal_sources.py.
+"""
+import math
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .rng import RandomLike, make_rng
+
+NORMAL_SOURCES = ('clt', 'box_muller', 'ziggurat')
+
+# Количество слагаемых ЦПТ по умолчанию: сумма 12 U[0,1] имеет дисперсию 1
+DEFAULT_CLT_TERMS = 12
+
+# Источники, сравниваемые compare_sources по умолчанию
+DEFAULT_REPORT_SOURCES = ('clt', 'clt-50', 'box_muller', 'ziggurat')
+
+
+class NormalSource:
+    """
+    Источник стандартных нормальных величин.
+
+    Аргументы:
+        name: Имя источника из NORMAL_SOURCES
+        n_terms: Количество слагаемых для 'clt'
+    """
+
+    def __init__(self, name: str = 'clt', n_terms: int = DEFAULT_CLT_TERMS):
+        if name not in NORMAL_SOURCES:
+            raise ValueError(f"Неизвестный источник '{name}', доступны: {', '.join(NORMAL_SOURCES)}")
+        if n_terms < 1:
+            raise ValueError(f"Количество слагаемых ЦПТ должно быть положительным, получено {n_terms}")
+        self.name = name
+        self.n_terms = int(n_terms)
+
+    @property
+    def label(self) -> str:
+        """Строковое обозначение, принимаемое as_source ('clt-50', 'ziggurat', ...)."""
+        if self.name == 'clt' and self.n_terms != DEFAULT_CLT_TERMS:
+            return f"clt-{self.n_terms}"
+        return self.name
+
+    @property
+    def exact(self) -> bool:
+        """True, если величины имеют точно нормальное распределение."""
+        return self.name != 'clt'
+
+    @property
+    def support(self) -> float:
+        """Наибольшее по модулю значение, которое может выдать источник."""
+        return math.sqrt(3 * self.n_terms) if self.name == 'clt' else math.inf
+
+    def __repr__(self) -> str:
+        return f"NormalSource('{self.label}')"
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, NormalSource) and self.label == other.label
+
+    def __hash__(self) -> int:
+        return hash(self.label)
+
+    def buffer_size(self, size: int) -> int:
+        """Размер вспомогательного буфера для size величин."""
+        if self.name == 'clt':
+            return self.n_terms * size
+        if self.name == 'box_muller':
+            return 2 * ((size + 1) // 2)
+        return 0
+
+    def fill(self, out: np.ndarray, rng: np.random.Generator, buffer: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Заполняет массив out стандартными нормальными величинами.
+
+        Аргументы:
+            out: Выходной массив float64 любой формы; если он не C-непрерывный
+                 (например, срез столбцов), величины генерируются во временный
+                 непрерывный массив и копируются в out
+            rng: Генератор случайных чисел
+            buffer: Вспомогательный буфер не меньше buffer_size(out.size)
+                    (выделяется, если не задан)
+
+        Возвращает:
+            out
+        """
+        if not out.flags.c_contiguous:
+            out[...] = self.fill(np.empty(out.shape), rng, buffer)
+            return out
+
+        size = out.size
+        if self.name == 'ziggurat':
+            rng.standard_normal(out=out)
+            return out
+        if buffer is None:
+            buffer = np.empty(self.buffer_size(size))
+
+        if self.name == 'clt':
+            # Сумма n_terms U[0,1] по первой оси, нормированная по ЦПТ
+            uniform_samples = buffer[:self.n_terms * size]
+            rng.random(out=uniform_samples)
+            np.sum(uniform_samples.reshape((self.n_terms,) + out.shape), axis=0, out=out)
+            out -= self.n_terms / 2
+            out /= np.sqrt(self.n_terms / 12)
+            return out
+
+        # Бокс-Мюллер: r = sqrt(-2 ln(1 - u1)), z = (r cos 2πu2, r sin 2πu2)
+        n_pairs = (size + 1) // 2
+        uniform_samples = buffer[:2 * n_pairs]
+        rng.random(out=uniform_samples)
+        radius = uniform_samples[:n_pairs]
+        angle = uniform_samples[n_pairs:]
+        # 1 - u1 лежит в (0, 1], логарифм конечен
+        np.negative(radius, out=radius)
+        np.log1p(radius, out=radius)
+        radius *= -2
+        np.sqrt(radius, out=radius)
+        angle *= 2 * np.pi
+
+        flat = out.reshape(-1)
+        np.cos(angle, out=flat[:n_pairs])
+        flat[:n_pairs] *= radius
+        n_rest = size - n_pairs
+        np.sin(angle[:n_rest], out=flat[n_pairs:])
+        flat[n_pairs:] *= radius[:n_rest]
+        return out
+
+    def standard_normal(self, shape: Union[int, Tuple[int, ...]], rng: RandomLike = None) -> np.ndarray:
+        """
+        Возвращает новый массив стандартных нормальных величин.
+
+        Аргументы:
+            shape: Форма массива
+            rng: Генератор случайных чисел или зерно
+        """
+        return self.fill(np.empty(shape), make_rng(rng))
+
+    def blocks(
+        self,
+        n_samples: int,
+        n_features: int,
+        chunk_size: int,
+        rng: np.random.Generator
+    ) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """
+        Выдает блоки стандартных нормальных векторов.
+
+        Блоки являются видами на переиспользуемый буфер и действительны
+        только до следующей итерации.
+
+        Возвращает:
+            Итератор кортежей (начало, конец, блок размера (конец - начало, n_features))
+        """
+        chunk_size = max(1, min(chunk_size, n_samples))
+
+        # Переиспользуемые буферы блока
+        z = np.empty((chunk_size, n_features))
+        buffer = np.empty(self.buffer_size(z.size))
+
+        for start in range(0, n_samples, chunk_size):
+            stop = min(start + chunk_size, n_samples)
+            z_block = z[:stop - start]
+            self.fill(z_block, rng, buffer)
+            yield start, stop, z_block
+
+
+NormalSourceLike = Union[str, NormalSource]
+
+
+def as_source(source: NormalSourceLike) -> NormalSource:
+    """
+    Приводит имя источника к NormalSource.
+
+    Аргументы:
+        source: NormalSource или строка 'clt', 'clt-<слагаемых>',
+                'box_muller', 'ziggurat'
+    """
+    if isinstance(source, NormalSource):
+        return source
+    name, _, n_terms = str(source).partition('-')
+    if n_terms:
+        if name != 'clt' or not n_terms.isdigit():
+            raise ValueError(f"Неверное обозначение источника '{source}', ожидается 'clt-<слагаемых>'")
+        return NormalSource(name, int(n_terms))
+    return NormalSource(name)
+
+
+def _tail_probability(k: float) -> float:
+    """Точная вероятность P(|Z| > k) для стандартной нормальной величины."""
+    return math.erfc(k / math.sqrt(2))
+
+
+def compare_sources(
+    sources: Sequence[NormalSourceLike] = DEFAULT_REPORT_SOURCES,
+    n_samples: int = 1_000_000,
+    thresholds: Sequence[float] = (2.0, 3.0, 4.0, 5.0),
+    repeat: int = 3,
+    chunk_size: int = 65536,
+    rng: Optional[int] = 0
+) -> List[Dict[str, Any]]:
+    """
+    Сравнивает источники нормальных величин по скорости и точности.
+
+    Скорость - лучшее из repeat время генерации n_samples величин
+    блоками по chunk_size (как в генераторах выборок). Точность
+    оценивается по той же выборке: первые четыре момента, хвосты
+    P(|Z| > k) относительно точных значений и статистика Колмогорова.
+    Для хвостов приводится и z-оценка отклонения: |z| < 2 означает,
+    что отклонение объяснимо случайностью выборки данного объёма.
+
+    Аргументы:
+        sources: Источники (NormalSource или обозначения для as_source)
+        n_samples: Объём выборки каждого источника
+        thresholds: Пороги k для хвостовых вероятностей
+        repeat: Количество замеров времени
+        chunk_size: Размер блока генерации
+        rng: Зерно (все источники и замеры начинают с одного зерна)
+
+    Возвращает:
+        Список словарей, по одному на источник
+    """
+    from scipy.special import ndtr
+
+    rows = []
+    z = np.empty(n_samples)
+    for source in sources:
+        source = as_source(source)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for block_start, block_stop, block in source.blocks(n_samples, 1, chunk_size, make_rng(rng)):
+                z[block_start:block_stop] = block[:, 0]
+            timings.append(time.perf_counter() - start)
+        seconds = min(timings)
+
+        centered = z - z.mean()
+        var = float(np.mean(centered ** 2))
+        row: Dict[str, Any] = {
+            'source': source.label,
+            'exact': source.exact,
+            'support': source.support,
+            'seconds': seconds,
+            'ns_per_value': seconds / n_samples * 1e9,
+            'mean': float(z.mean()),
+            'var': var,
+            'skewness': float(np.mean(centered ** 3) / var ** 1.5),
+            'excess_kurtosis': float(np.mean(centered ** 4) / var ** 2 - 3),
+        }
+
+        abs_z = np.abs(z)
+        for k in thresholds:
+            expected = _tail_probability(k)
+            observed = np.count_nonzero(abs_z > k) / n_samples
+            row[f'tail_{k:g}'] = observed
+            row[f'tail_{k:g}_exact'] = expected
+            row[f'tail_{k:g}_rel_error'] = (observed - expected) / expected
+            row[f'tail_{k:g}_z'] = (observed - expected) / math.sqrt(expected * (1 - expected) / n_samples)
+
+        # Статистика Колмогорова: наибольшее отклонение эмпирической функции распределения
+        cdf = ndtr(np.sort(z))
+        steps = np.arange(1, n_samples + 1) / n_samples
+        row['ks'] = float(max(np.max(steps - cdf), np.max(cdf - (steps - 1 / n_samples))))
+        rows.append(row)
+    return rows
+
+
+def format_source_report(rows: List[Dict[str, Any]]) -> str:
+    """
+    Форматирует результат compare_sources как таблицу Markdown.
+
+    Для каждого порога k приводится относительная ошибка хвоста
+    P(|Z| > k) и в скобках её z-оценка.
+    """
+    thresholds = [key[len('tail_'):-len('_exact')] for key in rows[0] if key.endswith('_exact')] if rows else []
+    header = ['источник', 'точный', 'нс/число', 'среднее', 'дисперсия', 'асимметрия', 'эксцесс', 'KS']
+    header += [f'хвост k={k}' for k in thresholds]
+    lines = ['| ' + ' | '.join(header) + ' |', '|' + '---|' * len(header)]
+    for row in rows:
+        cells = [
+            row['source'],
+            'да' if row['exact'] else 'нет',
+            f"{row['ns_per_value']:.2f}",
+            f"{row['mean']:+.2e}",
+            f"{row['var']:.4f}",
+            f"{row['skewness']:+.3f}",
+            f"{row['excess_kurtosis']:+.3f}",
+            f"{row['ks']:.2e}",
+        ]
+        cells += [f"{row[f'tail_{k}_rel_error']:+.1%} ({row[f'tail_{k}_z']:+.1f})" for k in thresholds]
+        lines.append('| ' + ' | '.join(cells) + ' |')
+    return '\n'.join(lines) + '\n'
@@ -1,18 +1,259 @@
+import json
 import os
 from pathlib import Path
-from typing import List, Dict, Any, Union, Tuple
-import matplotlib.pyplot as plt
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 import numpy as np
 
+from .instrumentation import timed
+from .rng import RandomLike, make_rng
+
+# Начиная с этого общего числа точек save_scatter рисует плотность вместо точек
+DENSITY_THRESHOLD = 100_000
+DEFAULT_BINS = 400
+DEFAULT_CHUNK_SIZE = 1_000_000
+# Радиусы эллипсов рассеяния в единицах стандартного отклонения
+ELLIPSE_STDS = (1, 2, 3)
+
+
+def _data_bounds(samples: List[np.ndarray], chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """Возвращает границы [[xmin, xmax], [ymin, ymax]] по первым двум признакам всех выборок."""
+    low = np.full(2, np.inf)
+    high = np.full(2, -np.inf)
+    for sample in samples:
+        for start in range(0, len(sample), chunk_size):
+            block = np.asarray(sample[start:start + chunk_size])
+            # Редукция по отдельным столбцам намного быстрее min(axis=0) для узких матриц
+            for j in range(2):
+                low[j] = min(low[j], block[:, j].min())
+                high[j] = max(high[j], block[:, j].max())
+    # Без точек границы берутся вокруг нуля, вырожденный диапазон
+    # расширяем, чтобы шаг сетки был ненулевым
+    empty = ~np.isfinite(low)
+    low[empty] = 0.0
+    high[empty] = 0.0
+    same = high <= low
+    low[same] -= 0.5
+    high[same] += 0.5
+    return np.column_stack([low, high])
+
+
+def _histogram2d(
+    sample: np.ndarray,
+    bounds: np.ndarray,
+    bins: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> np.ndarray:
+    """
+    Двумерная гистограмма первых двух признаков выборки.
+
+    Индексы ячеек вычисляются напрямую и суммируются через np.bincount
+    блоками: это в разы быстрее np.histogram2d и не требует памяти на
+    всю выборку (работает и с np.memmap).
+
+    Возвращает:
+        Матрицу счётчиков (bins по y, bins по x)
+    """
+    scale = bins / (bounds[:, 1] - bounds[:, 0])
+    counts = np.zeros(bins * bins, dtype=np.int64)
+    for start in range(0, len(sample), chunk_size):
+        block = np.asarray(sample[start:start + chunk_size])
+        index = np.zeros(len(block), dtype=np.intp)
+        for j in (1, 0):
+            cells = ((block[:, j] - bounds[j, 0]) * scale[j]).astype(np.intp)
+            np.clip(cells, 0, bins - 1, out=cells)
+            index *= bins
+            index += cells
+        counts += np.bincount(index, minlength=bins * bins)
+    return counts.reshape(bins, bins)
+
+
+def _stratified_subsample(
+    samples: List[np.ndarray],
+    n_points: int,
+    rng: RandomLike = None
+) -> List[np.ndarray]:
+    """
+    Случайная подвыборка, сохраняющая доли классов.
+
+    Аргументы:
+        samples: Список выборок
+        n_points: Общее количество точек в подвыборке
+        rng: Генератор случайных чисел или зерно
+
+    Возвращает:
+        Список подвыборок (меньшие выборки возвращаются целиком)
+    """
+    rng = make_rng(rng)
+    total = sum(len(sample) for sample in samples)
+    if total <= n_points:
+        return samples
+    result = []
+    for sample in samples:
+        n_class = max(1, round(n_points * len(sample) / total)) if len(sample) else 0
+        rows = np.sort(rng.choice(len(sample), size=min(n_class, len(sample)), replace=False))
+        result.append(np.asarray(sample[rows]))
+    return result
+
+
+def _draw_covariance_ellipses(ax: Any, mean: np.ndarray, cov: np.ndarray, color: Any) -> List[Any]:
+    """
+    Рисует эллипсы рассеяния уровня ELLIPSE_STDS по оценкам первых двух признаков.
+
+    Возвращает:
+        Список добавленных элементов графика
+    """
+    from matplotlib.patches import Ellipse
+
+    mean = np.asarray(mean, dtype=float)[:2]
+    cov = np.asarray(cov, dtype=float)[:2, :2]
+    eigenvalues, eigenvectors = np.linalg.eigh(cov)
+    angle = np.degrees(np.arctan2(eigenvectors[1, 1], eigenvectors[0, 1]))
+    axes = 2 * np.sqrt(np.maximum(eigenvalues, 0))
+    artists = []
+    for n_std in ELLIPSE_STDS:
+        artists.append(ax.add_patch(Ellipse(
+            mean, n_std * axes[1], n_std * axes[0], angle=angle,
+            fill=False, edgecolor=color, linewidth=1.2, linestyle='--', alpha=0.9
+        )))
+    artists.extend(ax.plot(*mean, marker='+', color=color, markersize=10, markeredgewidth=2))
+    return artists
+
+
+def _new_figure(figsize: Tuple[float, float] = (10, 6)) -> Tuple[Any, Any]:
+    """
+    Создает фигуру с холстом Agg без pyplot.
+
+    В отличие от plt.figure фигура не регистрируется в глобальном
+    состоянии pyplot: её не нужно закрывать, и её можно безопасно
+    использовать в разных потоках и процессах.
+
+    Возвращает:
+        Кортеж (фигура, оси)
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+def _prepare_samples(
+    samples: List[np.ndarray],
+    mode: str,
+    max_points: Optional[int],
+    colors: Optional[List[Any]],
+    rng: RandomLike
+) -> Tuple[List[np.ndarray], str, List[Any]]:
+    """Проверяет режим, выполняет подвыборку и выбирает режим и цвета по умолчанию."""
+    if mode not in ('auto', 'scatter', 'density'):
+        raise ValueError(f"Неизвестный режим '{mode}', ожидается 'auto', 'scatter' или 'density'")
+    if max_points is not None:
+        samples = _stratified_subsample(samples, max_points, rng)
+    if mode == 'auto':
+        mode = 'density' if sum(len(sample) for sample in samples) > DENSITY_THRESHOLD else 'scatter'
+    if colors is None:
+        colors = [f'C{i}' for i in range(len(samples))]
+    elif len(colors) == 0:
+        raise ValueError("Список цветов colors пуст")
+    return samples, mode, list(colors)
+
+
+def _density_image(sample: np.ndarray, bounds: np.ndarray, bins: int, color: Any) -> np.ndarray:
+    """RGBA-растр плотности одного класса: цвет класса, прозрачность - логарифм числа точек."""
+    from matplotlib.colors import to_rgb
+
+    counts = _histogram2d(sample, bounds, bins)
+    image = np.empty(counts.shape + (4,))
+    image[..., :3] = to_rgb(color)
+    image[..., 3] = np.log1p(counts) / np.log1p(counts.max())
+    return image
+
+
+def _draw_samples(
+    ax: Any,
+    samples: List[np.ndarray],
+    mode: str,
+    colors: List[Any],
+    bins: int
+) -> Tuple[List[Any], List[Any]]:
+    """
+    Рисует выборки точками или картами плотности.
+
+    Возвращает:
+        Кортеж (элементы графика непустых классов, элементы легенды)
+    """
+    from matplotlib.patches import Patch
+
+    artists = []
+    handles = []
+    if mode == 'scatter':
+        # Создаем scatter plot для каждой выборки
+        for i, sample in enumerate(samples):
+            if len(sample) == 0:
+                continue
+            artist = ax.scatter(
+                sample[:, 0], 
+                sample[:, 1], 
+                label=f'Класс {i+1}', 
+                color=colors[i % len(colors)],
+                alpha=0.6,
+                s=50,
+                edgecolors='w',
+                linewidth=0.5
+            )
+            artists.append(artist)
+            handles.append(artist)
+    else:
+        bounds = _data_bounds(samples)
+        for i, sample in enumerate(samples):
+            if len(sample) == 0:
+                continue
+            artist = ax.imshow(
+                _density_image(sample, bounds, bins, colors[i % len(colors)]), origin='lower',
+                extent=bounds.ravel(), aspect='auto', interpolation='nearest'
+            )
+            artists.append(artist)
+            handles.append(Patch(color=colors[i % len(colors)], label=f'Класс {i+1}'))
+        ax.set_xlim(bounds[0])
+        ax.set_ylim(bounds[1])
+    return artists, handles
+
+
+def _decorate(ax: Any, title: str, xlabel: str, ylabel: str) -> None:
+    ax.set_title(title, fontsize=14, pad=15)
+    ax.set_xlabel(xlabel, fontsize=12)
+    ax.set_ylabel(ylabel, fontsize=12)
+
+
+def _plot_filename(title: str) -> str:
+    return f"{title.lower().replace(' ', '_')}.png"
+
+
+@timed('plot')
 def save_scatter(
     samples: List[np.ndarray], 
     output_dir: Union[str, Path], 
     title: str,
     xlabel: str = "X",
-    ylabel: str = "Y"
+    ylabel: str = "Y",
+    colors: Optional[List[Any]] = None,
+    mode: str = 'auto',
+    max_points: Optional[int] = None,
+    estimates: Optional[List[Tuple[np.ndarray, np.ndarray]]] = None,
+    bins: int = DEFAULT_BINS,
+    rng: RandomLike = None
 ) -> str:
     """
     Создает и сохраняет scatter plot для набора выборок.
+
+    Для больших выборок отдельные точки неразличимы и рисуются очень
+    долго, поэтому в режиме 'density' каждая выборка рисуется
+    растровой картой плотности своего цвета (логарифмическая шкала
+    прозрачности). Время построения определяется числом ячеек сетки,
+    а подсчёт гистограммы - один линейный проход по данным.
+
+    Для серии графиков быстрее ScatterRenderer и render_scatter_batch.
     
     Аргументы:
         samples: Список массивов с выборками
@@ -20,46 +261,442 @@ def save_scatter(
         title: Заголовок графика
         xlabel: Подпись оси X
         ylabel: Подпись оси Y
+        colors: Цвета классов (по умолчанию цикл цветов matplotlib)
+        mode: 'scatter' - точки, 'density' - карта плотности,
+              'auto' - плотность, если точек больше DENSITY_THRESHOLD
+        max_points: Если задано, точки рисуются по стратифицированной
+                    подвыборке такого размера (доли классов сохраняются)
+        estimates: Оценки (мат. ожидание, ковариационная матрица) классов;
+                   если заданы, поверх рисуются эллипсы рассеяния 1, 2 и 3σ
+        bins: Количество ячеек сетки по каждой оси в режиме 'density'
+        rng: Генератор случайных чисел или зерно для подвыборки
         
     Возвращает:
         Путь к сохраненному файлу с графиком
     """
+    samples, mode, colors = _prepare_samples(samples, mode, max_points, colors, rng)
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
-    
-    plt.figure(figsize=(10, 6))
-    
-    # Создаем scatter plot для каждой выборки
-    for i, sample in enumerate(samples):
-        if len(sample) == 0:
-            continue
-        plt.scatter(
-            sample[:, 0], 
-            sample[:, 1], 
-            label=f'Класс {i+1}', 
-            alpha=0.6,
-            s=50,
-            edgecolors='w',
-            linewidth=0.5
-        )
-    
-    plt.title(title, fontsize=14, pad=15)
-    plt.xlabel(xlabel, fontsize=12)
-    plt.ylabel(ylabel, fontsize=12)
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.legend()
+
+    fig, ax = _new_figure()
+    _, handles = _draw_samples(ax, samples, mode, colors, bins)
+
+    if estimates is not None:
+        for i, (mean, cov) in enumerate(estimates):
+            _draw_covariance_ellipses(ax, mean, cov, colors[i % len(colors)])
+
+    _decorate(ax, title, xlabel, ylabel)
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.legend(handles=handles)
     
     # Улучшаем читаемость осей
-    plt.tight_layout()
+    fig.tight_layout()
     
     # Сохраняем график
-    filename = f"{title.lower().replace(' ', '_')}.png"
-    filepath = output_dir / filename
-    plt.savefig(filepath, dpi=150, bbox_inches='tight')
-    plt.close()
+    filepath = output_dir / _plot_filename(title)
+    fig.savefig(filepath, dpi=150, bbox_inches='tight')
     
     return str(filepath)
 
+
+def _write_png(image: np.ndarray, path: Path, dpi: int) -> None:
+    """Кодирует RGBA-буфер в PNG и записывает на диск (выполняется в фоновом потоке)."""
+    from PIL import Image
+
+    Image.fromarray(image).save(path, format='png', dpi=(dpi, dpi))
+
+
+class ScatterRenderer:
+    """
+    Построитель серии графиков на одной фигуре.
+
+    Фигура, холст Agg и оси создаются один раз. Если следующий график
+    похож на предыдущий (тот же режим и число классов), существующие
+    элементы обновляются (set_offsets для точек, set_data для карт
+    плотности) вместо построения осей заново. Кодирование PNG и запись
+    на диск выполняются в фоновых потоках, пока рисуется следующий график.
+
+    Использование:
+        with ScatterRenderer() as renderer:
+            for samples, title in plots:
+                renderer.render(samples, output_dir, title)
+    """
+
+    def __init__(self, figsize: Tuple[float, float] = (10, 6), dpi: int = 150, writer_threads: int = 2):
+        """
+        Аргументы:
+            figsize: Размер фигуры в дюймах
+            dpi: Разрешение PNG
+            writer_threads: Количество потоков записи PNG
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.fig, self.ax = _new_figure(figsize)
+        self.fig.set_dpi(dpi)
+        self.dpi = dpi
+        self._writer = ThreadPoolExecutor(max_workers=writer_threads)
+        self._pending = []
+        self._signature = None
+        self._layout = None
+        self._artists = []
+        self._overlays = []
+
+    @timed('plot')
+    def render(
+        self,
+        samples: List[np.ndarray],
+        output_dir: Union[str, Path],
+        title: str,
+        xlabel: str = "X",
+        ylabel: str = "Y",
+        colors: Optional[List[Any]] = None,
+        mode: str = 'auto',
+        max_points: Optional[int] = None,
+        estimates: Optional[List[Tuple[np.ndarray, np.ndarray]]] = None,
+        bins: int = DEFAULT_BINS,
+        rng: RandomLike = None
+    ) -> str:
+        """
+        Рисует график и ставит его запись в очередь.
+
+        Аргументы те же, что у save_scatter. Файл гарантированно записан
+        после flush() или выхода из блока with.
+
+        Возвращает:
+            Путь к файлу с графиком
+        """
+        samples, mode, colors = _prepare_samples(samples, mode, max_points, colors, rng)
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        class_colors = tuple(colors[i % len(colors)] for i in range(len(samples)))
+        signature = (mode, tuple(len(sample) > 0 for sample in samples), class_colors, bins)
+        if signature != self._signature:
+            self._redraw(samples, mode, colors, bins)
+            self._signature = signature
+        else:
+            self._update_samples(samples, mode, colors, bins)
+
+        for artist in self._overlays:
+            artist.remove()
+        self._overlays = []
+        if estimates is not None:
+            for i, (mean, cov) in enumerate(estimates):
+                self._overlays.extend(_draw_covariance_ellipses(self.ax, mean, cov, colors[i % len(colors)]))
+
+        _decorate(self.ax, title, xlabel, ylabel)
+        # Расчёт tight_layout стоит около трети отрисовки; поля фигуры
+        # переиспользуются, пока не изменились оформление и подписи
+        layout = (signature, title, xlabel, ylabel)
+        if layout != self._layout:
+            self.fig.tight_layout()
+            self._layout = layout
+        self.fig.canvas.draw()
+        image = np.array(self.fig.canvas.buffer_rgba())
+
+        filepath = output_dir / _plot_filename(title)
+        self._pending.append(self._writer.submit(_write_png, image, filepath, self.dpi))
+        return str(filepath)
+
+    def _redraw(self, samples: List[np.ndarray], mode: str, colors: List[Any], bins: int) -> None:
+        """Строит оси заново."""
+        self.ax.clear()
+        self._overlays = []
+        self._artists, handles = _draw_samples(self.ax, samples, mode, colors, bins)
+        self.ax.grid(True, linestyle='--', alpha=0.7)
+        self.ax.legend(handles=handles)
+
+    def _update_samples(self, samples: List[np.ndarray], mode: str, colors: List[Any], bins: int) -> None:
+        """Подставляет новые данные в существующие элементы графика."""
+        bounds = _data_bounds(samples)
+        filled = [(sample, colors[i % len(colors)]) for i, sample in enumerate(samples) if len(sample)]
+        if mode == 'scatter':
+            for artist, (sample, _) in zip(self._artists, filled):
+                artist.set_offsets(np.asarray(sample[:, :2]))
+            # Поля как у автомасштабирования matplotlib (5% диапазона)
+            margin = 0.05 * (bounds[:, 1] - bounds[:, 0])
+            bounds = bounds + np.column_stack([-margin, margin])
+        else:
+            for artist, (sample, color) in zip(self._artists, filled):
+                artist.set_data(_density_image(sample, bounds, bins, color))
+                artist.set_extent(bounds.ravel())
+        self.ax.set_xlim(bounds[0])
+        self.ax.set_ylim(bounds[1])
+
+    def flush(self) -> None:
+        """Дожидается записи всех поставленных в очередь файлов."""
+        pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+    def close(self) -> None:
+        """Дожидается записи файлов и освобождает потоки записи."""
+        try:
+            self.flush()
+        finally:
+            self._writer.shutdown()
+
+    def __enter__(self) -> 'ScatterRenderer':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def _load_samples(samples: List[Union[np.ndarray, str, Path]]) -> List[np.ndarray]:
+    """Открывает выборки, заданные путями к .npy, через memmap."""
+    return [
+        np.load(sample, mmap_mode='r') if isinstance(sample, (str, Path)) else sample
+        for sample in samples
+    ]
+
+
+def _render_jobs(jobs: List[Dict[str, Any]]) -> List[str]:
+    """Рисует группу графиков одним построителем (выполняется в процессе пула)."""
+    with ScatterRenderer() as renderer:
+        return [
+            renderer.render(**{**job, 'samples': _load_samples(job['samples'])})
+            for job in jobs
+        ]
+
+
+@timed('plot_batch')
+def render_scatter_batch(jobs: List[Dict[str, Any]], workers: Optional[int] = None) -> List[str]:
+    """
+    Строит серию графиков, распределяя их по процессам.
+
+    Графики сортируются по числу классов и делятся между процессами
+    непрерывными группами, чтобы внутри группы соседние графики были
+    похожи и построитель переиспользовал элементы фигуры.
+
+    Аргументы:
+        jobs: Список словарей с аргументами save_scatter (samples, output_dir,
+              title, ...). Выборки можно задавать путями к .npy: тогда они
+              открываются в процессе-исполнителе и не передаются через pickle
+        workers: Количество процессов (None - в текущем процессе,
+                 0 или меньше - все доступные ядра)
+
+    Возвращает:
+        Пути к файлам графиков в порядке jobs
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    from .data_generation import _resolve_workers
+
+    order = sorted(range(len(jobs)), key=lambda i: (len(jobs[i]['samples']), jobs[i].get('mode', 'auto')))
+    n_workers = 1 if workers is None else min(_resolve_workers(workers), max(len(jobs), 1))
+    groups = [list(group) for group in np.array_split(order, n_workers) if len(group)]
+
+    if n_workers == 1:
+        results = [_render_jobs([jobs[i] for i in group]) for group in groups]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(_render_jobs, [[jobs[i] for i in group] for group in groups]))
+
+    paths = [''] * len(jobs)
+    for group, group_paths in zip(groups, results):
+        for i, path in zip(group, group_paths):
+            paths[i] = path
+    return paths
+
+
+REPORT_TITLE = "# Лабораторная работа: Моделирование случайных векторов\n\n"
+
+REPORT_CONCLUSIONS = (
+    "\n## Выводы\n\n"
+    "1. Были успешно сгенерированы выборки случайных векторов с заданными параметрами.\n"
+    "2. Проведена оценка параметров распределений по выборкам.\n"
+    "3. Рассчитаны расстояния между распределениями.\n"
+    "4. Построены визуализации распределений.\n"
+    "5. Все результаты сохранены в соответствующие файлы.\n"
+)
+
+
+def _format_estimate(index: int, estimate: Tuple[np.ndarray, np.ndarray]) -> str:
+    mean, cov = estimate
+    return (
+        f"### Класс {index+1}:\n"
+        "**Математическое ожидание:**\n"
+        f"```\n{np.array2string(np.asarray(mean), precision=4, suppress_small=True)}\n```\n\n"
+        "**Ковариационная матрица:**\n"
+        f"```\n{np.array2string(np.asarray(cov), precision=4, suppress_small=True)}\n```\n\n"
+    )
+
+
+def _format_distance(index: int, item: Tuple[str, float]) -> str:
+    metric, value = item
+    return f"- **{metric}:** {value:.4f}\n"
+
+
+def _format_image(index: int, img_path: str) -> str:
+    img_name = Path(img_path).stem.replace('_', ' ').title()
+    return f"### {img_name}\n![]({img_path})\n\n"
+
+
+def _format_data_file(index: int, file_path: str) -> str:
+    return f"- `{file_path}`\n"
+
+
+class ReportBuilder:
+    """
+    Инкрементальный построитель Markdown отчета.
+
+    Отчет состоит из разделов (оценки, расстояния, графики, файлы), а
+    раздел - из элементов. Для каждого элемента в файле состояния рядом
+    с отчетом (<отчет>.state.json) хранится хэш входных данных и готовый
+    текст, для графиков - хэш данных, по которым он построен. При
+    повторной сборке форматируются и перерисовываются только элементы
+    с изменившимися входными данными.
+
+    Использование:
+        builder = ReportBuilder(output_path)
+        builder.estimates(estimations)
+        builder.distances(distances)
+        builder.plots(plot_jobs)
+        builder.data_files(data_files)
+        builder.write()
+    """
+
+    def __init__(self, output_path: Union[str, Path]):
+        """
+        Аргументы:
+            output_path: Путь для сохранения отчета
+        """
+        self.output_path = Path(output_path)
+        self.state_path = self.output_path.with_name(self.output_path.name + '.state.json')
+        self._state = {'sections': {}, 'plots': {}}
+        if self.state_path.exists():
+            with open(self.state_path, encoding='utf-8') as f:
+                self._state = json.load(f)
+        self._texts: Dict[str, str] = {}
+        # Количество пересобранных элементов и перерисованных графиков по разделам
+        self.rebuilt: Dict[str, int] = {}
+
+    def section(
+        self,
+        name: str,
+        heading: str,
+        items: List[Any],
+        format_item: Callable[[int, Any], str],
+        footer: str = ""
+    ) -> int:
+        """
+        Обновляет раздел отчета.
+
+        Аргументы:
+            name: Имя раздела в файле состояния
+            heading: Заголовок раздела (Markdown)
+            items: Входные данные элементов (хэшируются через params_digest)
+            format_item: Функция (номер, элемент) -> текст элемента
+            footer: Текст после элементов
+
+        Возвращает:
+            Количество заново отформатированных элементов
+        """
+        from .cache import params_digest
+
+        cached = self._state['sections'].get(name, {})
+        cached_texts = dict(zip(cached.get('hashes', []), cached.get('texts', [])))
+
+        hashes = []
+        texts = []
+        rebuilt = 0
+        for index, item in enumerate(items):
+            digest = params_digest([index, item])
+            text = cached_texts.get(digest)
+            if text is None:
+                text = format_item(index, item)
+                rebuilt += 1
+            hashes.append(digest)
+            texts.append(text)
+
+        self._state['sections'][name] = {'hashes': hashes, 'texts': texts}
+        self._texts[name] = heading + ''.join(texts) + footer
+        self.rebuilt[name] = rebuilt
+        return rebuilt
+
+    def estimates(self, estimations: List[Tuple[np.ndarray, np.ndarray]]) -> int:
+        """Раздел с оценками параметров распределений."""
+        return self.section(
+            'estimates', "## Оценки параметров распределений\n\n",
+            [(np.asarray(mean), np.asarray(cov)) for mean, cov in estimations], _format_estimate
+        )
+
+    def distances(self, distances: Dict[str, float]) -> int:
+        """Раздел с расстояниями между распределениями."""
+        return self.section(
+            'distances', "## Расстояния между распределениями\n\n",
+            [(metric, float(value)) for metric, value in distances.items()], _format_distance, "\n"
+        )
+
+    def images(self, img_paths: List[str]) -> int:
+        """Раздел с уже построенными графиками."""
+        return self.section(
+            'plots', "## Визуализация распределений\n\n", [str(p) for p in img_paths], _format_image
+        )
+
+    def plots(self, jobs: List[Dict[str, Any]], workers: Optional[int] = None) -> List[str]:
+        """
+        Строит графики, входные данные которых изменились, и обновляет раздел с ними.
+
+        Аргументы:
+            jobs: Аргументы save_scatter для каждого графика (как в render_scatter_batch);
+                  выборки, заданные путями, хэшируются по времени изменения и размеру
+                  файла, массивы - по содержимому
+            workers: Количество процессов для render_scatter_batch
+
+        Возвращает:
+            Пути к файлам графиков в порядке jobs
+        """
+        from .cache import params_digest
+
+        output_paths = [str(Path(job['output_dir']) / _plot_filename(job['title'])) for job in jobs]
+        digests = [
+            params_digest({
+                **{key: value for key, value in job.items() if key not in ('samples', 'output_dir', 'rng')},
+                'samples': [Path(s) if isinstance(s, (str, Path)) else np.asarray(s) for s in job['samples']],
+            })
+            for job in jobs
+        ]
+        plot_state = self._state['plots']
+        changed = [
+            i for i, (path, digest) in enumerate(zip(output_paths, digests))
+            if plot_state.get(path) != digest or not Path(path).exists()
+        ]
+        if changed:
+            render_scatter_batch([jobs[i] for i in changed], workers)
+        for i in changed:
+            plot_state[output_paths[i]] = digests[i]
+        # Графики, исчезнувшие из отчета, больше не отслеживаются
+        self._state['plots'] = {path: plot_state[path] for path in output_paths}
+
+        self.images(output_paths)
+        self.rebuilt['rendered'] = len(changed)
+        return output_paths
+
+    def data_files(self, data_files: List[str]) -> int:
+        """Раздел со списком файлов с данными."""
+        return self.section(
+            'files', "## Файлы с данными\n\n", [str(p) for p in data_files], _format_data_file
+        )
+
+    @timed('report')
+    def write(self) -> None:
+        """Собирает отчет из разделов и сохраняет его вместе с файлом состояния."""
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        order = ('estimates', 'distances', 'plots', 'files')
+        content = REPORT_TITLE + ''.join(self._texts.get(name, '') for name in order) + REPORT_CONCLUSIONS
+
+        # Файл отчета переписывается, только если текст изменился
+        if not self.output_path.exists() or self.output_path.read_text(encoding='utf-8') != content:
+            self.output_path.write_text(content, encoding='utf-8')
+
+        tmp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+
 def generate_report(
     estimations: List[Tuple[np.ndarray, np.ndarray]],
     distances: Dict[str, float],
@@ -69,6 +706,9 @@ def generate_report(
 ) -> None:
     """
     Генерирует Markdown отчет с результатами анализа.
+
+    Повторный вызов с тем же output_path форматирует заново только
+    изменившиеся элементы (см. ReportBuilder).
     
     Аргументы:
         estimations: Список кортежей (мат. ожидание, ковариационная матрица)
@@ -77,46 +717,11 @@ def generate_report(
         img_paths: Список путей к графикам
         output_path: Путь для сохранения отчета
     """
-    output_path = Path(output_path)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    with open(output_path, 'w', encoding='utf-8') as f:
-        # Заголовок отчета
-        f.write("# Лабораторная работа: Моделирование случайных векторов\n\n")
-        
-        # Раздел с параметрами распределений
-        f.write("## Оценки параметров распределений\n\n")
-        for i, (mean, cov) in enumerate(estimations):
-            f.write(f"### Класс {i+1}:\n")
-            f.write("**Математическое ожидание:**\n")
-            f.write(f"```\n{np.array2string(mean, precision=4, suppress_small=True)}\n```\n\n")
-            f.write("**Ковариационная матрица:**\n")
-            f.write(f"```\n{np.array2string(cov, precision=4, suppress_small=True)}\n```\n\n")
-        
-        # Раздел с расстояниями
-        f.write("## Расстояния между распределениями\n\n")
-        for metric, value in distances.items():
-            f.write(f"- **{metric}:** {value:.4f}\n")
-        f.write("\n")
-        
-        # Раздел с визуализациями
-        f.write("## Визуализация распределений\n\n")
-        for img_path in img_paths:
-            img_name = Path(img_path).stem.replace('_', ' ').title()
-            f.write(f"### {img_name}\n")
-            f.write(f"![]({img_path})\n\n")
-        
-        # Раздел с файлами данных
-        f.write("## Файлы с данными\n\n")
-        for file_path in data_files:
-            f.write(f"- `{file_path}`\n")
-        
-        # Заключение
-        f.write("\n## Выводы\n\n")
-        f.write("1. Были успешно сгенерированы выборки случайных векторов с заданными параметрами.\n")
-        f.write("2. Проведена оценка параметров распределений по выборкам.\n")
-        f.write("3. Рассчитаны расстояния между распределениями.\n")
-        f.write("4. Построены визуализации распределений.\n")
-        f.write("5. Все результаты сохранены в соответствующие файлы.\n")
+    builder = ReportBuilder(output_path)
+    builder.estimates(estimations)
+    builder.distances(distances)
+    builder.images(img_paths)
+    builder.data_files(data_files)
+    builder.write()
 
     print(f"Отчет успешно сохранен в {output_path}")
@@ -0,0 +1,147 @@
+"""
+Управление генераторами случайных чисел.
+
+Все генераторы выборок принимают аргумент rng: зерно (int), SeedSequence
+или готовый np.random.Generator. Для параллельной работы независимые
+воспроизводимые потоки получаются через SeedSequence.spawn.
+"""
+from typing import Dict, List, Optional, Tuple, Type, Union
+
+import numpy as np
+
+# Доступные битовые генераторы; PCG64DXSM и Philox быстрее и лучше подходят
+# для большого числа параллельных потоков
+BIT_GENERATORS: Dict[str, Type[np.random.BitGenerator]] = {
+    'pcg64': np.random.PCG64,
+    'pcg64dxsm': np.random.PCG64DXSM,
+    'philox': np.random.Philox,
+    'sfc64': np.random.SFC64,
+    'mt19937': np.random.MT19937,
+}
+
+DEFAULT_BIT_GENERATOR = 'pcg64'
+
+RandomLike = Union[None, int, np.random.SeedSequence, np.random.Generator]
+
+
+def _bit_generator_class(
+    bit_generator: Optional[str],
+    seed: RandomLike = None
+) -> Type[np.random.BitGenerator]:
+    """Возвращает класс битового генератора по имени."""
+    if bit_generator is None:
+        # Дочерние потоки наследуют тип генератора родителя
+        if isinstance(seed, np.random.Generator):
+            return type(seed.bit_generator)
+        bit_generator = DEFAULT_BIT_GENERATOR
+    try:
+        return BIT_GENERATORS[bit_generator.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Неизвестный битовый генератор '{bit_generator}', "
+            f"доступны: {', '.join(BIT_GENERATORS)}"
+        ) from None
+
+
+def make_rng(seed: RandomLike = None, bit_generator: Optional[str] = None) -> np.random.Generator:
+    """
+    Создает генератор случайных чисел.
+
+    Аргументы:
+        seed: Зерно, SeedSequence или готовый Generator (возвращается как есть).
+              None означает непредсказуемое зерно из энтропии ОС
+        bit_generator: Имя битового генератора из BIT_GENERATORS
+
+    Возвращает:
+        Экземпляр np.random.Generator
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.Generator(_bit_generator_class(bit_generator)(seed))
+
+
+def spawn_seeds(seed: RandomLike, n: int) -> List[np.random.SeedSequence]:
+    """
+    Порождает n независимых дочерних SeedSequence.
+
+    Для целого зерна результат полностью определяется (seed, n): i-й поток
+    не зависит от количества запрошенных потоков, что позволяет делить
+    работу между любым числом процессов.
+
+    Аргументы:
+        seed: Зерно, SeedSequence или Generator (из него извлекается энтропия)
+        n: Количество потоков
+
+    Возвращает:
+        Список дочерних SeedSequence
+    """
+    if isinstance(seed, np.random.Generator):
+        entropy = seed.integers(0, 2**63, size=4, dtype=np.uint64)
+        seed_seq = np.random.SeedSequence([int(e) for e in entropy])
+    elif isinstance(seed, np.random.SeedSequence):
+        seed_seq = seed
+    else:
+        seed_seq = np.random.SeedSequence(seed)
+    return seed_seq.spawn(n)
+
+
+def spawn_rngs(
+    seed: RandomLike,
+    n: int,
+    bit_generator: Optional[str] = None
+) -> List[np.random.Generator]:
+    """
+    Создает n независимых воспроизводимых генераторов для параллельной работы.
+
+    Аргументы:
+        seed: Зерно, SeedSequence или родительский Generator
+        n: Количество генераторов
+        bit_generator: Имя битового генератора (по умолчанию как у родителя или PCG64)
+
+    Возвращает:
+        Список экземпляров np.random.Generator
+    """
+    bit_generator_class = _bit_generator_class(bit_generator, seed)
+    return [np.random.Generator(bit_generator_class(child)) for child in spawn_seeds(seed, n)]
+
+
+def stream_rng(seed: int, index: int, bit_generator: Optional[str] = None) -> np.random.Generator:
+    """
+    Возвращает index-й поток зерна seed без порождения остальных.
+
+    Совпадает с spawn_rngs(seed, n)[index] при любом n > index.
+
+    Аргументы:
+        seed: Целое зерно
+        index: Номер потока
+        bit_generator: Имя битового генератора
+
+    Возвращает:
+        Экземпляр np.random.Generator
+    """
+    seed_seq = np.random.SeedSequence(seed, spawn_key=(index,))
+    return np.random.Generator(_bit_generator_class(bit_generator)(seed_seq))
+
+
+def recordable_seed(seed: RandomLike) -> Tuple[RandomLike, Optional[int]]:
+    """
+    Фиксирует зерно так, чтобы его можно было сохранить вместе с данными.
+
+    Для seed=None энтропия берётся из ОС один раз и возвращается, чтобы
+    генерацию можно было повторить. Для готового Generator исходное
+    зерно восстановить нельзя.
+
+    Аргументы:
+        seed: Зерно, SeedSequence или Generator
+
+    Возвращает:
+        Кортеж (зерно для генерации, целое зерно для записи или None)
+    """
+    if seed is None:
+        seed_seq = np.random.SeedSequence()
+        return seed_seq, seed_seq.entropy
+    if isinstance(seed, (int, np.integer)):
+        return seed, int(seed)
+    if isinstance(seed, np.random.SeedSequence) and not seed.spawn_key:
+        return seed, seed.entropy
+    return seed, None